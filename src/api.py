@@ -2,62 +2,113 @@ from __future__ import annotations
 
 import asyncio
 from contextlib import asynccontextmanager
-import json
+from functools import cache, lru_cache, partial
 import os
 from pathlib import Path
+import re
+import secrets
 import tempfile
-from typing import Annotated, Any
+from typing import Annotated, Any, BinaryIO
 
-from dotenv import load_dotenv
 from fastapi import (
-    BackgroundTasks,
     Depends,
     FastAPI,
-    File,
-    Form,
     HTTPException,
-    UploadFile,
+    Request,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 import firebase_admin
 from firebase_admin import credentials
+import orjson
 import psycopg
 from pydantic import BaseModel
 
-from src.config import FIREBASE_ADMIN_CREDS, LOGGER
+from src.config import FIREBASE_ADMIN_CREDS, INGEST_LEASE_SECONDS, LOGGER
 from src.ingest.embed_and_update_chunks import backfill_missing_chunk_embeddings
-from src.ingest.pdf_ingest import compute_checksum, ingest_pdf
+from src.ingest.ingest_worker import drain_ingestion_queue
 from src.utils.database import (
-    create_ingestion_run,
+    close_sync_pool,
+    fetch_ingestion_run,
+    find_ingested_document,
     get_conn,
-    get_ingestion_run,
-    init_pool,
-    update_ingestion_status,
-    upsert_document,
+    open_pool,
+    queue_document_ingestion,
+)
+from src.utils.storage import delete_file_fn, upload_file_fn
+from src.utils.uploads import StreamingPdfUpload, UploadError
+from src.utils.workers import (
+    INGEST_CHANNEL,
+    MAINTENANCE_CHANNEL,
+    QUERY_CHANNEL,
+    ChannelFullError,
+    shutdown_channels,
 )
 
 from .query import answer_query
 
 
+@cache
+def _firebase_credentials() -> credentials.Certificate:
+    """Parse the service-account credentials once per process."""
+    return credentials.Certificate(FIREBASE_ADMIN_CREDS)
+
+
+def _init_firebase() -> firebase_admin.App:
+    """Return the default Firebase app, initializing it only if needed."""
+    try:
+        return firebase_admin.get_app()
+    except ValueError:
+        return firebase_admin.initialize_app(_firebase_credentials())
+
+
+async def _sweep_ingestion_queue(interval: float) -> None:
+    """Drain the ingest queue on a timer so runs whose lease expired are retried without waiting for an upload."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            INGEST_CHANNEL.submit(drain_ingestion_queue)
+        except ChannelFullError:
+            LOGGER.info("Ingest channel full; skipping this ingestion queue sweep.")
+
+
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    load_dotenv()
+    # .env is loaded once by src.config at import time.
     LOGGER.info("Starting ChatIEEE API application lifespan.")
-    cred = credentials.Certificate(FIREBASE_ADMIN_CREDS)
-    app = firebase_admin.initialize_app(cred)
+    app = _init_firebase()
     if app:
         LOGGER.info("Initialized Firebase Admin SDK with app name: %s", app.name)
-    pool = init_pool()
+    try:
+        pool = await open_pool(wait=True)
+        LOGGER.info("Database pool warmed with %d connections.", pool.min_size)
+    except Exception as exc:
+        # Connections will be retried lazily by get_conn; do not block startup.
+        LOGGER.error("Failed to pre-warm database pool: %s", exc)
+        pool = await open_pool()
+    try:
+        # Pick up runs queued or abandoned before the last shutdown.
+        INGEST_CHANNEL.submit(drain_ingestion_queue)
+    except ChannelFullError:
+        LOGGER.error("Ingest channel full at startup; queued runs will wait for the next sweep.")
+    sweeper = asyncio.create_task(_sweep_ingestion_queue(max(INGEST_LEASE_SECONDS, 1.0)))
     try:
         yield
     finally:
+        sweeper.cancel()
+        shutdown_channels()
         await pool.close()
+        await asyncio.to_thread(close_sync_pool)
 
 
-app = FastAPI(title="ChatIEEE API", version="0.1.0", lifespan=lifespan)
+app = FastAPI(
+    title="ChatIEEE API",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 Conn = Annotated[psycopg.AsyncConnection, Depends(get_conn)]
-origins = [o.strip() for o in os.getenv("CORS_ALLOW_ORIGINS", "").split(",") if o.strip()] or [
+origins = tuple(o.strip() for o in os.getenv("CORS_ALLOW_ORIGINS", "").split(",") if o.strip()) or (
     "http://localhost:3000",
     "http://127.0.0.1:3000",
     "https://localhost:3000",
@@ -70,13 +121,19 @@ origins = [o.strip() for o in os.getenv("CORS_ALLOW_ORIGINS", "").split(",") if
     "https://us-west1-chat-ieee.cloudfunctions.net/ssrchatieee",
     "https://chat-ieee.firebaseapp.com",
     "https://chat-ieee.web.app",
-]
+)
+# Starlette scans allow_origins as a list on every CORS request; match a single
+# compiled alternation of the same exact origins instead ("*" still allows any).
+ALLOW_ORIGIN_RE = re.compile(
+    "|".join(".*" if origin == "*" else re.escape(origin) for origin in dict.fromkeys(origins))
+)
 
-_FAVICON_PATH = Path(__file__).resolve().parent.parent / "public" / "favicon.ico"
-_DEFAULT_DOCUMENTS_DIR = Path(__file__).resolve().parent.parent / "documents"
-_RESOLVED_DOCUMENTS_DIR: Path | None = None
+_PKG_ROOT = Path(__file__).resolve().parent.parent
+_FAVICON_PATH = _PKG_ROOT / "public" / "favicon.ico"
+_DEFAULT_DOCUMENTS_DIR = _PKG_ROOT / "documents"
 
 
+@lru_cache(maxsize=1)
 def _resolve_documents_dir() -> Path:
     """
     Choose a writable directory for uploads.
@@ -85,12 +142,9 @@ def _resolve_documents_dir() -> Path:
       1) Env override (DOCUMENTS_DIR or UPLOAD_BASE_DIR)
       2) Repo's documents folder (for local dev)
       3) Ephemeral /tmp mount (Cloud Run safe)
-    """
-    global _RESOLVED_DOCUMENTS_DIR
-    if _RESOLVED_DOCUMENTS_DIR is not None:
-        LOGGER.info("Using cached upload directory: %s", _RESOLVED_DOCUMENTS_DIR)
-        return _RESOLVED_DOCUMENTS_DIR
 
+    The first successful result is cached for the life of the process.
+    """
     env_dir = os.getenv("DOCUMENTS_DIR") or os.getenv("UPLOAD_BASE_DIR")
     LOGGER.info("Attempting to resolve upload directory. Env override: %s", env_dir)
     candidates = [Path(env_dir)] if env_dir else []
@@ -105,7 +159,6 @@ def _resolve_documents_dir() -> Path:
             if not os.access(directory, os.W_OK):
                 LOGGER.error("Directory is not writable: %s", directory)
                 raise PermissionError(f"Directory is not writable: {directory}")  # noqa
-            _RESOLVED_DOCUMENTS_DIR = directory
             LOGGER.info("Upload directory is usable: %s", directory)
             return directory
         except Exception as exc:  # pragma: no cover - defensive logging
@@ -120,179 +173,208 @@ class QueryRequest(BaseModel):
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=origins,
+    allow_origin_regex=ALLOW_ORIGIN_RE.pattern,
     allow_credentials=True,
     allow_methods=["GET", "POST", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["*"],
 )
 
-def process_ingest_background(
-    run_id: str,
-    pdf_path: str,
-    doc_id: int,
-    metadata: dict[str, Any],
-    check_strikeouts: bool,
-):
-    """Background task wrapper to handle status updates."""
+@cache
+def _favicon_stat() -> os.stat_result | None:
+    """Stat the bundled favicon once; it does not change while the app runs."""
     try:
-        ingest_pdf(
-            pdf_path=pdf_path,
-            external_id=metadata["external_id"],
-            title=metadata["title"],
-            description=metadata["description"],
-            source_uri=metadata["source_uri"],
-            check_strikeouts=check_strikeouts,
-        )
-        update_ingestion_status(run_id, "completed")
-        LOGGER.info("Ingestion run %s completed successfully", run_id)
-    except Exception as e:
-        LOGGER.error("Ingestion run %s failed: %s", run_id, e, exc_info=True)
-        update_ingestion_status(run_id, "failed", str(e))
+        return _FAVICON_PATH.stat()
+    except OSError:
+        return None
 
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon() -> FileResponse:
-    if not _FAVICON_PATH.exists():
+    favicon_stat = _favicon_stat()
+    if favicon_stat is None:
         raise HTTPException(status_code=404, detail="favicon not found")
-    return FileResponse(_FAVICON_PATH, media_type="image/x-icon")
+    return FileResponse(_FAVICON_PATH, media_type="image/x-icon", stat_result=favicon_stat)
 
 @app.get("/healthz", tags=["Health"])
 async def healthz() -> dict[str, str]:
     """Health check endpoint."""
     return {"status": "ok"}
 
-@app.post("/ingest_pdf", tags=["Ingestion"])
-async def ingest_pdf_endpoint(
-    background_tasks: BackgroundTasks,
-    pdf: UploadFile | None = None,
-    external_id: str | None = Form(None),
-    title: str | None = Form(None),
-    description: str | None = Form(None),
-    source_uri: str | None = Form(None),
-    draft_document: bool = Form(False),
-) -> dict[str, str]:
-    """Persist an uploaded PDF and ingest it into the system."""
-
-    if pdf is None:
-        pdf = File(...)
-    if pdf:
-        filename = (pdf.filename or "uploaded.pdf").strip()
-        if not filename.lower().endswith(".pdf") and pdf.content_type != "application/pdf":
-            LOGGER.error("Uploaded file is not a PDF: filename=%s, content_type=%s", filename, pdf.content_type)
-            raise HTTPException(status_code=400, detail="Uploaded file must be a PDF document.")
-
-        target_dir = _resolve_documents_dir()
-        safe_name = Path(filename).name
-        destination = target_dir / safe_name
-
-        counter = 1
-        while destination.exists():
-            destination = target_dir / f"{Path(safe_name).stem}_{counter}{Path(safe_name).suffix or '.pdf'}"
-            counter += 1
+@app.get("/healthz/db", tags=["Health"])
+async def healthz_db(conn: Conn) -> dict[str, str]:
+    """Database health check; round-trips a pooled connection."""
+    async with conn.cursor() as cur:
+        await cur.execute("SELECT 1")
+    return {"status": "ok"}
 
+def _allocate_destination(target_dir: Path, filename: str, content_type: str | None) -> tuple[Path, BinaryIO]:
+    """
+    Validate the uploaded file name and atomically create a file for it.
+
+    The original name is tried first; on collision a random suffix is added and
+    the create retried. ``O_CREAT | O_EXCL`` makes each attempt a single syscall
+    and stops two concurrent uploads from claiming the same path.
+    """
+    filename = filename or "uploaded.pdf"
+    if not filename.lower().endswith(".pdf") and content_type != "application/pdf":
+        LOGGER.error("Uploaded file is not a PDF: filename=%s, content_type=%s", filename, content_type)
+        raise UploadError("Uploaded file must be a PDF document.")
+
+    safe_path = Path(Path(filename).name)
+    stem, suffix = safe_path.stem, safe_path.suffix or ".pdf"
+    destination = target_dir / safe_path.name
+
+    while True:
         try:
-            with destination.open("wb") as buffer:
-                while True:
-                    chunk = await pdf.read(1024 * 1024)
-                    if not chunk:
-                        break
-                    buffer.write(chunk)
-        except Exception as exc:
-            LOGGER.error("Failed to store uploaded PDF: %s", exc, exc_info=True)
-            if destination.exists():
-                destination.unlink(missing_ok=True)
-            raise HTTPException(status_code=500, detail="Failed to store uploaded PDF.") from exc
-        finally:
-            LOGGER.info("Closing uploaded PDF file: %s", filename)
-            await pdf.close()
-
-        if destination.stat().st_size == 0:
-            destination.unlink(missing_ok=True)
-            raise HTTPException(status_code=400, detail="Uploaded PDF is empty.")
-
-        checksum = await asyncio.to_thread(compute_checksum, str(destination))
-
-        eff_external_id = external_id or destination.name
-
-        doc_id = await asyncio.to_thread(
-            upsert_document,
-            external_id=eff_external_id,
-            title=title or destination.stem,
-            description=description,
-            source_uri=source_uri,
-            checksum=checksum,
-            total_pages=0,
-            metadata={}
-        )
+            fd = os.open(destination, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            destination = target_dir / f"{stem}_{secrets.token_hex(4)}{suffix}"
+            continue
+        return destination, os.fdopen(fd, "wb")
+
+@app.post("/ingest_pdf", tags=["Ingestion"])
+async def ingest_pdf_endpoint(request: Request) -> dict[str, Any]:
+    """Stream an uploaded PDF to disk and ingest it into the system.
+
+    Expects a multipart/form-data body with a ``pdf`` file part and optional
+    ``external_id``, ``title``, ``description``, ``source_uri`` and
+    ``draft_document`` text fields.
+    """
 
-        run_id = await asyncio.to_thread(
-            create_ingestion_run,
-            doc_id
+    target_dir = _resolve_documents_dir()
+    try:
+        upload = StreamingPdfUpload(
+            request.headers.get("content-type", ""),
+            destination_factory=partial(_allocate_destination, target_dir),
         )
-        check_strikeouts = bool(draft_document)
-
-        background_tasks.add_task(
-            process_ingest_background,
-            run_id=run_id,
-            pdf_path=str(destination),
-            doc_id=doc_id,
-            metadata={
+    except UploadError as exc:
+        LOGGER.error("Rejected PDF upload: %s", exc)
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    try:
+        await upload.consume(request.stream())
+    except UploadError as exc:
+        LOGGER.error("Rejected PDF upload: %s", exc)
+        await upload.discard()
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:
+        LOGGER.error("Failed to store uploaded PDF: %s", exc, exc_info=True)
+        await upload.discard()
+        raise HTTPException(status_code=500, detail="Failed to store uploaded PDF.") from exc
+
+    destination = upload.destination
+    if destination is None:
+        raise HTTPException(status_code=400, detail="No PDF file uploaded.")
+    LOGGER.info("Stored uploaded PDF %s (%d bytes) at %s", upload.filename, upload.size, destination)
+
+    if upload.size == 0:
+        await asyncio.to_thread(destination.unlink, missing_ok=True)
+        raise HTTPException(status_code=400, detail="Uploaded PDF is empty.")
+
+    fields = upload.fields
+    external_id = fields.get("external_id") or None
+    title = fields.get("title") or None
+    description = fields.get("description") or None
+    source_uri = fields.get("source_uri") or None
+    draft_document = fields.get("draft_document", "").strip().lower() in {"1", "true", "yes", "on"}
+
+    checksum = upload.checksum
+    eff_external_id = external_id or destination.name
+    eff_title = title or destination.stem
+    pdf_uri: str | None = None
+    try:
+        existing_doc_id = await asyncio.to_thread(find_ingested_document, checksum)
+        if existing_doc_id is None:
+            # The local copy is on this instance's ephemeral disk; stage the PDF
+            # in the bucket so whichever instance claims the run (or this one
+            # after a restart) can still read it.
+            pdf_uri = await asyncio.to_thread(upload_file_fn, str(destination), destination.name)
+            _, run_id = await asyncio.to_thread(
+                queue_document_ingestion,
+                external_id=eff_external_id,
+                title=eff_title,
+                description=description,
+                source_uri=source_uri,
+                checksum=checksum,
+                payload={
+                    "pdf_path": str(destination),
+                    "pdf_uri": pdf_uri,
                     "external_id": eff_external_id,
-                    "title": title or destination.stem,
+                    "title": eff_title,
                     "description": description,
                     "source_uri": source_uri,
-                    "check_strikeouts": check_strikeouts,
-            },
-            check_strikeouts=check_strikeouts,
-        )
-
-        relative_path = destination.relative_to(_resolve_documents_dir().parent)
+                    "check_strikeouts": bool(draft_document),
+                    "checksum": checksum,
+                },
+            )
+    except Exception as exc:
+        LOGGER.error("Failed to queue uploaded PDF %s: %s", destination, exc, exc_info=True)
+        await asyncio.to_thread(destination.unlink, missing_ok=True)
+        if pdf_uri is not None:
+            await asyncio.to_thread(delete_file_fn, pdf_uri)
+        raise HTTPException(status_code=500, detail="Failed to queue uploaded PDF.") from exc
+
+    if existing_doc_id is not None:
+        LOGGER.info("Upload %s matches already ingested document %s; skipping", upload.filename, existing_doc_id)
+        await asyncio.to_thread(destination.unlink, missing_ok=True)
         return {
-            "status": "processing",
-            "run_id": run_id,
-            "document_path": str(relative_path),
-            "message": f"Document '{destination.name}' is being processed.",
+            "status": "already_ingested",
+            "document_id": existing_doc_id,
+            "message": f"Document '{upload.filename}' has already been ingested.",
         }
-    raise HTTPException(status_code=400, detail="No PDF file uploaded.")
+
+    try:
+        INGEST_CHANNEL.submit(drain_ingestion_queue)
+    except ChannelFullError:
+        # The run is persisted as queued; a drain already in flight will claim it.
+        LOGGER.info("Ingest channel busy; run %s stays queued", run_id)
+
+    relative_path = destination.relative_to(target_dir.parent)
+    return {
+        "status": "queued",
+        "run_id": run_id,
+        "document_path": str(relative_path),
+        "message": f"Document '{destination.name}' has been queued for processing.",
+    }
 
 @app.get("/ingest/{run_id}", tags=["Ingestion"])
 async def get_ingest_status(run_id: str, conn: Conn) -> dict[str, Any]:
     """Check the status of a background ingestion run."""
-    del conn
-    run = await asyncio.to_thread(get_ingestion_run, run_id)
+    run = await fetch_ingestion_run(conn, run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     return run
 
 @app.post("/chunks/backfill_missing_embeddings", tags=["Maintenance"])
-async def backfill_missing_embeddings(conn: Conn, limit: int | None = None) -> dict[str, Any]:
+async def backfill_missing_embeddings(limit: int | None = None) -> dict[str, Any]:
     """Fill in missing embeddings while stripping headers/footers and merging metadata."""
-    del conn
     try:
-        updated = await asyncio.to_thread(backfill_missing_chunk_embeddings, limit)
+        updated = await MAINTENANCE_CHANNEL.run(backfill_missing_chunk_embeddings, limit)
+    except ChannelFullError as exc:
+        raise HTTPException(status_code=503, detail="A backfill is already queued; try again later.") from exc
     except Exception as exc:  # pragma: no cover - defensive logging
         LOGGER.error("Failed to backfill missing embeddings: %s", exc, exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to backfill missing embeddings.") from exc
     return {"status": "ok", "updated_chunks": updated}
 
 @app.post("/query", tags=["Query"])
-async def query_endpoint(payload: QueryRequest, conn: Conn) -> dict[str, Any]:
+async def query_endpoint(payload: QueryRequest) -> dict[str, Any]:
     """Answer a natural language question using ingested documents."""
-    del conn  # Ensures dependency runs even though synchronous helpers are used elsewhere.
-
     query = payload.query.strip()
     if not query:
         LOGGER.error("Empty query received.")
         raise HTTPException(status_code=400, detail="Query text is required.")
 
     try:
-        raw_response = await asyncio.to_thread(answer_query, query)
+        raw_response = await QUERY_CHANNEL.run(answer_query, query)
         LOGGER.info("Received raw response for query '%s': %s", query, raw_response)
+    except ChannelFullError as exc:
+        raise HTTPException(status_code=503, detail="Query capacity exceeded; try again later.") from exc
     except Exception as exc:  # pragma: no cover - defensive logging
         LOGGER.error("Error processing query: %s", exc, exc_info=True)
         raise HTTPException(status_code=500, detail="Query processing failed.") from exc
 
     try:
-        return json.loads(raw_response)
-    except json.JSONDecodeError as exc:
+        return orjson.loads(raw_response)
+    except orjson.JSONDecodeError as exc:
         LOGGER.error("Received malformed response from answer generator: %s", exc, exc_info=True)
         raise HTTPException(status_code=500, detail="Received malformed response from answer generator.") from exc
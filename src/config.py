@@ -10,8 +10,36 @@ load_dotenv()
 
 LOGGER = setup_logger(__name__)
 
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer env var once at import, naming the variable if it is malformed."""
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return int(raw)
+    except ValueError as exc:
+        raise ValueError(f"Environment variable {name} must be an integer, got {raw!r}") from exc
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float env var once at import, naming the variable if it is malformed."""
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return float(raw)
+    except ValueError as exc:
+        raise ValueError(f"Environment variable {name} must be a number, got {raw!r}") from exc
+
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MAX_CONNECTIONS = _env_int("OPENAI_MAX_CONNECTIONS", 32)
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_MIN_SIZE = _env_int("DB_POOL_MIN_SIZE", 5)
+DB_POOL_MAX_SIZE = _env_int("DB_POOL_MAX_SIZE", 20)
+DB_POOL_MAX_IDLE = _env_float("DB_POOL_MAX_IDLE", 300.0)
+DB_PREPARE_THRESHOLD = _env_int("DB_PREPARE_THRESHOLD", 2)
 
 FIREBASE_ADMIN_CREDS = None
 _firebase_admin_creds_path = os.environ.get("FIREBASE_ADMIN_CREDS")
@@ -20,18 +48,39 @@ if _firebase_admin_creds_path:
         FIREBASE_ADMIN_CREDS = json.load(f)
 
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_BATCH_SIZE = _env_int("EMBEDDING_BATCH_SIZE", 96)
+EMBEDDING_CACHE_SIZE = _env_int("EMBEDDING_CACHE_SIZE", 10000)
+EMBEDDING_CONCURRENCY = _env_int("EMBEDDING_CONCURRENCY", 4)
 ANSWER_MODEL = os.getenv("ANSWER_MODEL", "gpt-5")
-MAX_CONTEXT_CHARS = int(os.getenv("MAX_CONTEXT_CHARS", "8000"))
+MAX_CONTEXT_CHARS = _env_int("MAX_CONTEXT_CHARS", 8000)
 
 # --- Reranker envs ---
 RERANK_MODEL = os.getenv("RAG_RERANK_MODEL", "gpt-5-mini")
-VECTOR_K = int(os.getenv("DEFAULT_VECTOR_K", "20"))
-LEXICAL_K = int(os.getenv("DEFAULT_LEXICAL_K", "20"))
-TOP_K = int(os.getenv("DEFAULT_TOP_K", "10"))
+VECTOR_K = _env_int("DEFAULT_VECTOR_K", 20)
+LEXICAL_K = _env_int("DEFAULT_LEXICAL_K", 20)
+TOP_K = _env_int("DEFAULT_TOP_K", 10)
 DEFAULT_VERBOSITY = os.getenv("DEFAULT_VERBOSITY", "high")
 
+# --- Worker channel envs ---
+QUERY_WORKERS = _env_int("QUERY_WORKERS", 8)
+QUERY_MAX_PENDING = _env_int("QUERY_MAX_PENDING", 64)
+INGEST_WORKERS = _env_int("INGEST_WORKERS", 2)
+INGEST_MAX_PENDING = _env_int("INGEST_MAX_PENDING", 16)
+MAINTENANCE_WORKERS = _env_int("MAINTENANCE_WORKERS", 1)
+MAINTENANCE_MAX_PENDING = _env_int("MAINTENANCE_MAX_PENDING", 4)
+INGEST_LEASE_SECONDS = _env_float("INGEST_LEASE_SECONDS", 300.0)
+INGEST_HEARTBEAT_SECONDS = _env_float("INGEST_HEARTBEAT_SECONDS", 60.0)
+INGEST_MAX_ATTEMPTS = _env_int("INGEST_MAX_ATTEMPTS", 3)
+INGESTED_CHECKSUM_TTL = _env_float("INGESTED_CHECKSUM_TTL", 300.0)
+
 # --- Ingestion envs ---
-CHUNK_UPDATE_BATCH_SIZE = int(os.getenv("CHUNK_UPDATE_BATCH_SIZE", "200"))
+UPLOAD_MAX_FIELD_BYTES = _env_int("UPLOAD_MAX_FIELD_BYTES", 64 * 1024)
+UPLOAD_MAX_FIELDS = _env_int("UPLOAD_MAX_FIELDS", 32)
+CHUNK_UPDATE_BATCH_SIZE = _env_int("CHUNK_UPDATE_BATCH_SIZE", 200)
+PDF_EXTRACT_WORKERS = _env_int("PDF_EXTRACT_WORKERS", min(os.cpu_count() or 1, 4))
+PDF_EXTRACT_MIN_PAGES_PER_WORKER = _env_int("PDF_EXTRACT_MIN_PAGES_PER_WORKER", 50)
+IMAGE_UPLOAD_WORKERS = _env_int("IMAGE_UPLOAD_WORKERS", 8)
+PNG_COMPRESS_LEVEL = _env_int("PNG_COMPRESS_LEVEL", 6)
 DOCUMENT_HEADERS = [
     "IEEE Std 802-2024 IEEE Standard for Local and Metropolitan Area Networks: Overview and Architecture",
     "IEEE Std 802-2024",
@@ -1,19 +1,28 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 import re
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
+from pgvector.psycopg import HalfVector, register_vector
+import orjson
 import psycopg
-from psycopg import sql as _sql
-from psycopg.types.json import Jsonb
 
 from src import config
 
-from .embedding import EmbeddingClient, embedding_to_pgvector
+from .embedding import EmbeddingClient, EmbeddingResult, content_hash
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
 
 logger = config.LOGGER
 
+# Chunk metadata key recording which embedder produced the stored vector, so
+# unchanged chunks are not re-embedded on every run.
+EMBEDDING_SOURCE_KEY = "embedding_source"
+
 @dataclass(slots=True)
 class ChunkRow:
     id: int
@@ -21,6 +30,7 @@ class ChunkRow:
     content: str
     metadata: dict[str, Any]
     needs_update: bool = True
+    content_changed: bool = True
 
 @dataclass(slots=True)
 class StructureState:
@@ -49,6 +59,28 @@ class StructureState:
             payload["page_numbers"] = list(self.page_span)
         return payload
 
+@dataclass(slots=True)
+class PendingBatch:
+    """Staged chunk updates, held column-wise as the ``unnest`` arrays they are sent as."""
+    embeddings: list[HalfVector | None] = field(default_factory=list)
+    contents: list[str] = field(default_factory=list)
+    # Serialized metadata changes, merged into the stored metadata with ``||``.
+    metadata: list[str] = field(default_factory=list)
+    ids: list[int] = field(default_factory=list)
+    # New vectors to add to rag_embedding_cache when the batch is flushed.
+    cache_hashes: list[bytes] = field(default_factory=list)
+    cache_vectors: list[HalfVector] = field(default_factory=list)
+    def __len__(self) -> int:
+        return len(self.ids)
+    def add(self, embedding: HalfVector | None, content: str, metadata: str, chunk_id: int) -> None:
+        self.embeddings.append(embedding)
+        self.contents.append(content)
+        self.metadata.append(metadata)
+        self.ids.append(chunk_id)
+    def clear(self) -> None:
+        for column in (self.embeddings, self.contents, self.metadata, self.ids, self.cache_hashes, self.cache_vectors):
+            column.clear()
+
 class StructureTracker:
     """Track headings, sections, and page numbers across a document."""
     STRUCTURE_RE = re.compile(
@@ -56,64 +88,99 @@ class StructureTracker:
         re.IGNORECASE,
     )
     ALT_HEADING_RE = re.compile(r"^[A-Z][A-Z0-9 /&'\-]{3,}$")
-    PAGE_PATTERNS = (
-        re.compile(r"(?i)\bpage\s+(?P<page>\d{1,4})\b"),
-        re.compile(r"(?i)\bpg\.\s*(?P<page>\d{1,4})\b"),
-        re.compile(r"(?i)\bp\.\s*(?P<page>\d{1,4})\b"),
-        re.compile(r"^\s*-{0,3}\s*(?P<page>\d{1,4})\s*-{0,3}\s*$"),
-    )
+    # First characters STRUCTURE_RE can match on a stripped line ("1.2 ...", "Section ...").
+    STRUCTURE_START = frozenset("0123456789Ss")
+    BARE_PAGE_START = frozenset("0123456789-")
+    # "page 12", "pg. 12" and "p. 12" in one pattern; the prefixes cannot
+    # overlap, so finditer yields every match each one would find alone.
+    # Leading with the [Pp] class (the lookbehind stands in for \b) lets re
+    # skip ahead to candidate letters instead of trying every position.
+    PAGE_REF_RE = re.compile(r"[Pp](?<!\w[Pp])(?:[Aa][Gg][Ee]\s+|[Gg]\.\s*|\.\s*)(?P<page>\d{1,4})\b")
+    # A line holding only a page number, e.g. "12" or "- 12 -".
+    BARE_PAGE_RE = re.compile(r"^\s*-{0,3}\s*(?P<page>\d{1,4})\s*-{0,3}\s*$")
+    # Which reference wins when a line has several: "page" over "pg." over "p.".
+    PAGE_REF_RANK = {"pa": 0, "pg": 1, "p.": 2}
     def __init__(self) -> None:
         self._state = StructureState()
     def reset(self) -> None:
         self._state = StructureState()
     def consume(self, content: str) -> dict[str, Any]:
-        pages = self._extract_page_numbers(content)
-        if pages:
-            ordered = tuple(sorted(set(pages)))
-            self._state.page_span = ordered
-            self._state.page_number = ordered[0]
+        """
+        Update the tracked structure from one chunk and return its metadata.
+
+        Lines are scanned once: the same pass collects every page reference in
+        the chunk and the page number each line points at. Any reference
+        replaces the previous page span; lines naming a page also set the
+        current page.
+        """
+        refs: set[int] = set()
+        line_pages: set[int] = set()
+        last_page: int | None = None
+        bare_lines = 0
+        nonblank_lines = 0
         for line in content.splitlines():
             stripped = line.strip()
             if not stripped:
                 continue
-            matched_page = self._match_page_number(stripped)
+            nonblank_lines += 1
+            matched_page, bare = self._scan_line_pages(stripped, refs)
             if matched_page is not None:
-                self._state.page_number = matched_page
-                self._state.page_span = tuple(sorted({matched_page, *self._state.page_span}))
+                bare_lines += bare
+                last_page = matched_page
+                line_pages.add(matched_page)
                 continue
-            match = self.STRUCTURE_RE.match(stripped)
+            match = self.STRUCTURE_RE.match(stripped) if stripped[0] in self.STRUCTURE_START else None
             if match:
                 numbering = match.group("num")
                 title = match.group("title").strip().rstrip(". ")
                 label = f"{numbering} {title}".strip()
                 self._update_hierarchy(numbering, label)
                 continue
-            if self.ALT_HEADING_RE.match(stripped):
+            # isupper() is a necessary condition for ALT_HEADING_RE and far cheaper.
+            if stripped.isupper() and self.ALT_HEADING_RE.match(stripped):
                 formatted = stripped.title()
                 self._state.heading = formatted
                 self._state.section = None
                 self._state.subsection = None
+        if bare_lines and nonblank_lines == 1:
+            # A chunk that is nothing but a page number counts as a reference.
+            refs.update(line_pages)
+        if refs:
+            self._state.page_number = min(refs)
+            self._state.page_span = tuple(sorted(refs | line_pages))
+        elif line_pages and not line_pages.issubset(self._state.page_span):
+            # Only grow (and re-sort) the carried span when a line adds a new page.
+            self._state.page_span = tuple(sorted(line_pages.union(self._state.page_span)))
+        if last_page is not None:
+            self._state.page_number = last_page
         return self._state.to_metadata()
-    def _match_page_number(self, line: str) -> int | None:
-        for pattern in self.PAGE_PATTERNS:
-            match = pattern.search(line)
+    def _scan_line_pages(self, line: str, refs: set[int]) -> tuple[int | None, bool]:
+        """
+        Add the page references in a stripped line to ``refs``.
+
+        Returns the page the line refers to (preferring "page" over "pg." over
+        "p.", then a bare page-number line) and whether that came from a bare line.
+        """
+        # Substring checks rule out most lines before any regex runs: references
+        # need "page"/"pg."/"p." and a bare page number starts with a digit or dash.
+        lowered = line.lower()
+        best: int | None = None
+        if "p." in lowered or "pg." in lowered or "page" in lowered:
+            best_rank = len(self.PAGE_REF_RANK)
+            for match in self.PAGE_REF_RE.finditer(line):
+                # The group only matches decimal digits, so int() cannot fail.
+                page = int(match.group("page"))
+                refs.add(page)
+                rank = self.PAGE_REF_RANK[match.group(0)[:2].lower()]
+                if rank < best_rank:
+                    best, best_rank = page, rank
+        if best is not None:
+            return best, False
+        if line[:1] in self.BARE_PAGE_START:
+            match = self.BARE_PAGE_RE.search(line)
             if match:
-                page = match.group("page")
-                try:
-                    return int(page)
-                except ValueError:
-                    continue
-        return None
-    def _extract_page_numbers(self, content: str) -> list[int]:
-        pages: list[int] = []
-        for pattern in self.PAGE_PATTERNS:
-            for match in pattern.finditer(content):
-                raw = match.group("page")
-                try:
-                    pages.append(int(raw))
-                except ValueError:
-                    continue
-        return pages
+                return int(match.group("page")), True
+        return None, False
     def _update_hierarchy(self, numbering: str, label: str) -> None:
         segments = [segment for segment in numbering.split(".") if segment]
         if not segments:
@@ -137,11 +204,24 @@ class StructureTracker:
 
 class ChunkUpdater:
     START_HEADING_RE = re.compile(r"\b1[\.\)]?\s*overview\b", re.IGNORECASE)
+    # Rows fetched per keyset-paginated scan query.
+    SCAN_PAGE_SIZE = 2000
 
-    def __init__(self, conninfo: str, batch_size: int = 64, embedding_model: str | None = None) -> None:
+    def __init__(
+        self,
+        conninfo: str,
+        batch_size: int = 64,
+        embedding_model: str | None = None,
+        embedding_concurrency: int | None = None,
+    ) -> None:
         self.conninfo = conninfo
         self.batch_size = batch_size
         self.embedder = EmbeddingClient(model=embedding_model)
+        self.embedding_concurrency = max(1, embedding_concurrency or config.EMBEDDING_CONCURRENCY)
+        self._executor: ThreadPoolExecutor | None = None
+        self._persistent_cache = False
+        self._last_metadata: tuple[dict[str, Any], str] | None = None
+        self._in_flight: deque[tuple[Future[list[EmbeddingResult]], list[tuple[ChunkRow, str]]]] = deque()
         self._header_patterns = self._build_literal_patterns(config.DOCUMENT_HEADERS)
         self._footer_patterns = self._build_literal_patterns(config.DOCUMENT_FOOTERS)
 
@@ -150,61 +230,62 @@ class ChunkUpdater:
             "Starting chunk update job",
             extra={"limit": limit, "only_missing_embeddings": only_missing_embeddings},
         )
-        with psycopg.connect(self.conninfo) as conn:
+        # Embedding requests run on worker threads while this thread keeps
+        # scanning rows and writing finished batches, so network waits overlap
+        # with database work. Only this thread touches the connection.
+        with (
+            psycopg.connect(self.conninfo) as conn,
+            ThreadPoolExecutor(
+                max_workers=self.embedding_concurrency, thread_name_prefix="chatieee-embed"
+            ) as self._executor,
+        ):
             conn.execute("SET statement_timeout TO '10min'")
+            # Embeddings go out as binary halfvec: 2 bytes per component and
+            # no float parsing on the server.
+            register_vector(conn)
+            self._persistent_cache = self._embedding_cache_available(conn)
+            # Every flush commits; the job is re-runnable (unembedded rows are
+            # picked up again), so it need not wait for each WAL flush.
+            conn.execute("SET synchronous_commit TO off")
+            self._in_flight.clear()
             tracker = StructureTracker()
-            batch: list[tuple[str, str, Jsonb, int]] = []
+            # Chunks awaiting embeddings are pooled across documents, so short
+            # documents share embedding requests instead of each sending a
+            # small one.
+            pending: list[tuple[ChunkRow, str]] = []
+            batch = PendingBatch()
             processed = 0
             current_document: int | None = None
             document_rows: list[ChunkRow] = []
-            query_parts = [
-                "SELECT id, document_id, COALESCE(chunk_index, id) AS order_index,",
-                "content, COALESCE(metadata, '{}'::jsonb) AS metadata,",
-                "embedding IS NULL AS needs_update",
-                "FROM rag_chunk",
-            ]
-            params: tuple[int, ...] | None = None
-            if only_missing_embeddings:
-                query_parts.append(
-                    "WHERE document_id IN (SELECT DISTINCT document_id FROM rag_chunk WHERE embedding IS NULL)"
-                )
-            query_parts.append("ORDER BY document_id, order_index")
-            if limit:
-                query_parts.append("LIMIT %s")
-                params = (int(limit),)
-            query = " ".join(query_parts)
-            with conn.cursor() as cur:
-                cur.execute(_sql.SQL(query), params)    # type: ignore
-                for row in cur:
-                    chunk = ChunkRow(
-                        id=row[0],
-                        document_id=row[1],
-                        content=row[3] or "",
-                        metadata=row[4] or {},
-                        needs_update=bool(row[5]),
-                    )
-                    if current_document is None:
-                        current_document = chunk.document_id
-                    if chunk.document_id != current_document:
-                        processed += self._process_document(
-                            conn,
-                            tracker,
-                            document_rows,
-                            batch,
-                            update_missing_only=only_missing_embeddings,
-                        )
-                        document_rows = [chunk]
-                        current_document = chunk.document_id
-                    else:
-                        document_rows.append(chunk)
-                if document_rows:
+            for chunk in self._scan_chunks(conn, limit, only_missing_embeddings):
+                if current_document is None:
+                    current_document = chunk.document_id
+                if chunk.document_id != current_document:
                     processed += self._process_document(
                         conn,
                         tracker,
                         document_rows,
+                        pending,
                         batch,
                         update_missing_only=only_missing_embeddings,
                     )
+                    document_rows = [chunk]
+                    current_document = chunk.document_id
+                else:
+                    document_rows.append(chunk)
+            if document_rows:
+                processed += self._process_document(
+                    conn,
+                    tracker,
+                    document_rows,
+                    pending,
+                    batch,
+                    update_missing_only=only_missing_embeddings,
+                )
+            if pending:
+                self._embed_pending(conn, pending, batch)
+            while self._in_flight:
+                self._stage_embedded(conn, batch)
             if batch:
                 self._flush_batch(conn, batch)
             conn.commit()
@@ -214,12 +295,74 @@ class ChunkUpdater:
         )
         return processed
 
+    def _scan_chunks(
+        self,
+        conn: psycopg.Connection[Any],
+        limit: int | None,
+        only_missing_embeddings: bool,
+    ) -> Iterator[ChunkRow]:
+        """
+        Yield chunks in ``(document_id, chunk_index)`` order, SCAN_PAGE_SIZE rows per query.
+
+        Each page resumes after the last key seen, so no cursor stays open
+        across the commits made by each flush and every page is an index range
+        scan on ``idx_rag_chunk_document_index``.
+        """
+        document_filter = ""
+        document_ids: list[int] = []
+        if only_missing_embeddings:
+            rows = conn.execute("SELECT DISTINCT document_id FROM rag_chunk WHERE embedding IS NULL").fetchall()
+            document_ids = [row[0] for row in rows]
+            if not document_ids:
+                return
+            document_filter = "AND document_id = ANY(%(document_ids)s)"
+        query = f"""
+            SELECT id, document_id, chunk_index, content,
+                   COALESCE(metadata, '{{}}'::jsonb) AS metadata,
+                   embedding IS NULL AS needs_update
+              FROM rag_chunk
+             WHERE (document_id, chunk_index) > (%(document_id)s, %(chunk_index)s)
+                   {document_filter}
+             ORDER BY document_id, chunk_index
+             LIMIT %(page_size)s
+        """
+        # chunk_index is never negative, so (-1, -1) sorts before every row.
+        last_key = (-1, -1)
+        remaining = int(limit) if limit else None
+        while remaining is None or remaining > 0:
+            page_size = self.SCAN_PAGE_SIZE if remaining is None else min(self.SCAN_PAGE_SIZE, remaining)
+            with conn.cursor() as cur:
+                cur.execute(
+                    query,    # type: ignore
+                    {
+                        "document_id": last_key[0],
+                        "chunk_index": last_key[1],
+                        "document_ids": document_ids,
+                        "page_size": page_size,
+                    },
+                )
+                rows = cur.fetchall()
+            for row in rows:
+                yield ChunkRow(
+                    id=row[0],
+                    document_id=row[1],
+                    content=row[3] or "",
+                    metadata=row[4] or {},
+                    needs_update=bool(row[5]),
+                )
+            if len(rows) < page_size:
+                return
+            last_key = (rows[-1][1], rows[-1][2])
+            if remaining is not None:
+                remaining -= len(rows)
+
     def _process_document(
         self,
         conn: psycopg.Connection[Any],
         tracker: StructureTracker,
         rows: list[ChunkRow],
-        batch: list[tuple[str, str, Jsonb, int]],
+        pending: list[tuple[ChunkRow, str]],
+        batch: PendingBatch,
         update_missing_only: bool,
     ) -> int:
         filtered = self._prepare_rows(rows)
@@ -234,46 +377,168 @@ class ChunkUpdater:
         tracker.reset()
         updated = 0
         for chunk in filtered:
-            updates = tracker.consume(chunk.content)
-            merged = self._merge_metadata(chunk.metadata, updates)
+            changes = self._metadata_changes(chunk.metadata, tracker.consume(chunk.content))
             if update_missing_only and not chunk.needs_update:
                 continue
-            embedding = self.embedder.embed(chunk.content)
-            pgvector = embedding_to_pgvector(embedding.vector)
-            batch.append((pgvector, chunk.content, Jsonb(merged or {}), chunk.id))
+            if self._has_current_embedding(chunk):
+                # The stored embedding was made from this exact text by this
+                # model; refresh metadata only.
+                batch.add(None, chunk.content, self._encode_metadata(changes), chunk.id)
+                updated += 1
+                if len(batch) >= self.batch_size:
+                    self._flush_batch(conn, batch)
+                continue
+            changes[EMBEDDING_SOURCE_KEY] = self.embedder.source
+            pending.append((chunk, self._encode_metadata(changes)))
             updated += 1
+            # One embedding request per submission: ``embed_many`` would split
+            # a larger list into serial requests inside a single worker.
+            if len(pending) >= config.EMBEDDING_BATCH_SIZE:
+                self._embed_pending(conn, pending, batch)
+        return updated
+
+    def _has_current_embedding(self, chunk: ChunkRow) -> bool:
+        return (
+            not chunk.needs_update
+            and not chunk.content_changed
+            and chunk.metadata.get(EMBEDDING_SOURCE_KEY) == self.embedder.source
+        )
+
+    def _embed_pending(
+        self,
+        conn: psycopg.Connection[Any],
+        pending: list[tuple[ChunkRow, str]],
+        batch: PendingBatch,
+    ) -> None:
+        """
+        Submit queued chunks as one embedding request.
+
+        At most ``embedding_concurrency`` requests are outstanding; once the
+        limit is reached the oldest is awaited and staged first, which keeps
+        updates in scan order.
+        """
+        assert self._executor is not None
+        while len(self._in_flight) >= self.embedding_concurrency:
+            self._stage_embedded(conn, batch)
+        chunks = list(pending)
+        pending.clear()
+        if self._persistent_cache:
+            chunks = self._stage_cached(conn, chunks, batch)
+            if not chunks:
+                return
+        future = self._executor.submit(self.embedder.embed_many, [chunk.content for chunk, _ in chunks])
+        self._in_flight.append((future, chunks))
+
+    @staticmethod
+    def _embedding_cache_available(conn: psycopg.Connection[Any]) -> bool:
+        row = conn.execute("SELECT to_regclass('rag_embedding_cache') IS NOT NULL").fetchone()
+        available = bool(row and row[0])
+        if not available:
+            logger.info("rag_embedding_cache table not found; embeddings will not be cached in the database")
+        return available
+
+    def _stage_cached(
+        self,
+        conn: psycopg.Connection[Any],
+        chunks: list[tuple[ChunkRow, str]],
+        batch: PendingBatch,
+    ) -> list[tuple[ChunkRow, str]]:
+        """Stage chunks whose text is in ``rag_embedding_cache``; return the rest."""
+        keys = [content_hash(chunk.content.strip()) for chunk, _ in chunks]
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT content_hash, embedding FROM rag_embedding_cache WHERE source = %s AND content_hash = ANY(%s)",
+                (self.embedder.source, keys),
+            )
+            cached: dict[bytes, HalfVector] = {bytes(key): vector for key, vector in cur}
+        if cached:
+            logger.info("Reusing %d cached embeddings", len(cached))
+        misses: list[tuple[ChunkRow, str]] = []
+        for (chunk, metadata), key in zip(chunks, keys, strict=True):
+            vector = cached.get(key)
+            if vector is None:
+                misses.append((chunk, metadata))
+                continue
+            batch.add(vector, chunk.content, metadata, chunk.id)
             if len(batch) >= self.batch_size:
                 self._flush_batch(conn, batch)
-        return updated
+        return misses
 
-    def _flush_batch(self, conn: psycopg.Connection[Any], batch: list[tuple[str, str, Jsonb, int]]) -> None:
+    def _stage_embedded(
+        self,
+        conn: psycopg.Connection[Any],
+        batch: PendingBatch,
+    ) -> None:
+        """Wait for the oldest embedding request and stage its chunk updates."""
+        future, chunks = self._in_flight.popleft()
+        embeddings = future.result()
+        for (chunk, metadata), embedding in zip(chunks, embeddings, strict=True):
+            vector = HalfVector(embedding.vector)
+            batch.add(vector, chunk.content, metadata, chunk.id)
+            if self._persistent_cache:
+                batch.cache_hashes.append(content_hash(chunk.content.strip()))
+                batch.cache_vectors.append(vector)
+            if len(batch) >= self.batch_size:
+                self._flush_batch(conn, batch)
+
+    def _flush_batch(self, conn: psycopg.Connection[Any], batch: PendingBatch) -> None:
+        """
+        Apply staged updates with one ``UPDATE ... FROM unnest(...)`` statement per batch.
+
+        BEGIN, the UPDATE and COMMIT go out in one pipeline sync, so a flush
+        costs a single network round trip.
+        """
         logger.info("Flushing %s chunk updates", len(batch))
-        with conn.cursor() as cur:
-            cur.executemany(
+        with conn.pipeline(), conn.cursor() as cur:
+            cur.execute(
                 """
-                UPDATE rag_chunk
-                   SET embedding = %s::vector,
-                       content = %s,
-                       metadata = COALESCE(metadata, '{}'::jsonb) || %s::jsonb
-                 WHERE id = %s
+                UPDATE rag_chunk AS c
+                   SET embedding = COALESCE(u.embedding, c.embedding),
+                       content = u.content,
+                       metadata = COALESCE(c.metadata, '{}'::jsonb) || u.metadata
+                  FROM unnest(%b::halfvec[], %s::text[], %s::jsonb[], %s::bigint[])
+                       AS u(embedding, content, metadata, id)
+                 WHERE c.id = u.id
                 """,
-                batch,
+                (batch.embeddings, batch.contents, batch.metadata, batch.ids),
             )
-        conn.commit()
+            if batch.cache_hashes:
+                cur.execute(
+                    """
+                    INSERT INTO rag_embedding_cache (source, content_hash, embedding)
+                    SELECT %s, h, e FROM unnest(%s::bytea[], %b::halfvec[]) AS u(h, e)
+                    ON CONFLICT DO NOTHING
+                    """,
+                    (self.embedder.source, batch.cache_hashes, batch.cache_vectors),
+                )
+            conn.commit()
         batch.clear()
 
-    def _merge_metadata(self, existing: dict[str, Any], updates: dict[str, Any]) -> dict[str, Any]:
-        merged = dict(existing or {})
+    def _metadata_changes(self, existing: dict[str, Any], updates: dict[str, Any]) -> dict[str, Any]:
+        """
+        Return the keys to merge into a chunk's stored metadata.
+
+        Only the changes are sent; ``_flush_batch`` merges them with ``||``.
+        A page span also sets ``page_number`` when neither the tracker nor the
+        stored metadata provides one.
+        """
+        changes: dict[str, Any] = {}
         for key, value in updates.items():
             if value is None:
                 continue
-            if key == "page_numbers":
-                merged[key] = value
-                if value and "page_number" not in updates:
-                    merged.setdefault("page_number", value[0])
-            else:
-                merged[key] = value
-        return merged
+            changes[key] = value
+            if key == "page_numbers" and value and "page_number" not in updates and "page_number" not in existing:
+                changes["page_number"] = value[0]
+        return changes
+
+    def _encode_metadata(self, changes: dict[str, Any]) -> str:
+        # Consecutive chunks of a section usually carry identical changes, so
+        # reuse the previous encoding instead of serializing the same dict again.
+        if self._last_metadata is not None and self._last_metadata[0] == changes:
+            return self._last_metadata[1]
+        encoded = orjson.dumps(changes).decode()
+        self._last_metadata = (changes, encoded)
+        return encoded
 
     def _prepare_rows(self, rows: list[ChunkRow]) -> list[ChunkRow]:
         cleaned_chunks: list[ChunkRow] = []
@@ -289,6 +554,7 @@ class ChunkUpdater:
                     if not cleaned:
                         continue
                     heading_trimmed = True
+            chunk.content_changed = cleaned != chunk.content
             chunk.content = cleaned
             cleaned_chunks.append(chunk)
         return cleaned_chunks
@@ -296,16 +562,19 @@ class ChunkUpdater:
     def _strip_headers_and_footers(self, content: str) -> str:
         if not content:
             return ""
+        # Most chunks contain few of the configured strings; a substring check
+        # on the lowercased text skips the regex scan for the rest.
         cleaned = content
-        for pattern in self._header_patterns:
-            cleaned = pattern.sub(" ", cleaned)
-        for pattern in self._footer_patterns:
-            cleaned = pattern.sub(" ", cleaned)
+        lowered = content.lower()
+        for needle, pattern in self._header_patterns + self._footer_patterns:
+            if needle in lowered:
+                cleaned = pattern.sub(" ", cleaned)
         return cleaned.strip()
 
     @staticmethod
-    def _build_literal_patterns(values: list[str]) -> tuple[re.Pattern[str], ...]:
-        patterns: list[re.Pattern[str]] = []
+    def _build_literal_patterns(values: list[str]) -> tuple[tuple[str, re.Pattern[str]], ...]:
+        """Compile each string to a whitespace-tolerant pattern, paired with its longest token as a prefilter."""
+        patterns: list[tuple[str, re.Pattern[str]]] = []
         for value in values:
             if not value:
                 continue
@@ -316,7 +585,8 @@ class ChunkUpdater:
             if not tokens:
                 continue
             token_pattern = r"\s+".join(re.escape(token) for token in tokens)
-            patterns.append(re.compile(token_pattern, re.IGNORECASE | re.DOTALL | re.MULTILINE))
+            needle = max(tokens, key=len).lower()
+            patterns.append((needle, re.compile(token_pattern, re.IGNORECASE | re.DOTALL | re.MULTILINE)))
         return tuple(patterns)
 
 def embed_and_update_chunks():
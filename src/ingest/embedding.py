@@ -1,30 +1,110 @@
 from __future__ import annotations
 
+import base64
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import cache
 import hashlib
+from operator import itemgetter
+import threading
 from typing import TYPE_CHECKING
 
 import numpy as np
+import orjson
 
 if TYPE_CHECKING:
     from collections.abc import Sequence
 
 from src import config
-
-try:  # pragma: no cover - optional dependency for runtime environments without OpenAI
-    from openai import OpenAI
-except Exception:  # pragma: no cover - allows offline execution without the SDK
-    OpenAI = None  # type: ignore
+from src.utils.openai_client import OpenAI, get_openai_client
 
 _DEFAULT_MODEL = config.EMBEDDING_MODEL
 _EMBEDDING_DIMENSION = 1536
+_BATCH_SIZE = config.EMBEDDING_BATCH_SIZE
+_ZERO_VECTOR = np.zeros(_EMBEDDING_DIMENSION, dtype=np.float32)
+_ZERO_VECTOR.flags.writeable = False
 
 @dataclass(slots=True)
 class EmbeddingResult:
-    """Simple container for embedding outputs."""
-    vector: list[float]
+    """Simple container for embedding outputs (``vector`` is a read-only float32 array)."""
+    vector: np.ndarray
     model: str
 
+_CacheKey = tuple[str, bytes]
+
+def content_hash(text: str) -> bytes:
+    """Digest identifying an embedding input; shared by the in-process and database caches."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+class _EmbeddingCache:
+    """Thread-safe LRU of API embeddings keyed by model and a digest of the text.
+
+    Keys being fetched are tracked too, so concurrent callers embedding the
+    same text (e.g. boilerplate in overlapping batches) share one request.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._entries: OrderedDict[_CacheKey, np.ndarray] = OrderedDict()
+        self._in_flight: dict[_CacheKey, Future[np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, text: str) -> _CacheKey:
+        return (model, content_hash(text))
+
+    def reserve(
+        self, keys: Sequence[_CacheKey]
+    ) -> tuple[dict[_CacheKey, np.ndarray], list[_CacheKey], dict[_CacheKey, Future[np.ndarray]]]:
+        """Split ``keys`` into cached vectors, keys the caller must fetch, and keys already being fetched.
+
+        Every key returned for fetching must later be passed to `fulfil` or `abandon`.
+        """
+        cached: dict[_CacheKey, np.ndarray] = {}
+        owned: list[_CacheKey] = []
+        waiting: dict[_CacheKey, Future[np.ndarray]] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    cached[key] = vector
+                elif (future := self._in_flight.get(key)) is not None:
+                    waiting[key] = future
+                else:
+                    self._in_flight[key] = Future()
+                    owned.append(key)
+        return cached, owned, waiting
+
+    def fulfil(self, key: _CacheKey, vector: np.ndarray) -> None:
+        """Store a fetched vector and release callers waiting on it."""
+        with self._lock:
+            future = self._in_flight.pop(key, None)
+            if self.maxsize > 0:
+                self._entries[key] = vector
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        if future is not None:
+            future.set_result(vector)
+
+    def abandon(self, keys: Sequence[_CacheKey], exc: BaseException) -> None:
+        """Fail reserved keys that were not fetched, propagating ``exc`` to waiters."""
+        with self._lock:
+            futures = [future for key in keys if (future := self._in_flight.pop(key, None)) is not None]
+        for future in futures:
+            future.set_exception(exc)
+
+_CACHE = _EmbeddingCache(config.EMBEDDING_CACHE_SIZE)
+
+@cache
+def _request_executor() -> ThreadPoolExecutor:
+    """Threads for sending the requests of one large ``embed_many`` call side by side."""
+    return ThreadPoolExecutor(
+        max_workers=max(1, config.EMBEDDING_CONCURRENCY), thread_name_prefix="chatieee-embed-request"
+    )
+
 class EmbeddingClient:
     """Wrapper around OpenAI embeddings with an offline fallback.
     The ingestion and query pipelines depend on deterministic embeddings for
@@ -32,6 +112,10 @@ class EmbeddingClient:
     present the real embedding endpoint is used; otherwise we fall back to a
     hash-based pseudo-embedding that preserves cosine ordering characteristics
     well enough for local testing.
+
+    Real embeddings are requested in batches of up to ``EMBEDDING_BATCH_SIZE``
+    inputs and memoised in a process-wide LRU, so repeated queries and re-ingested
+    boilerplate skip the network round trip.
     """
     def __init__(self, model: str | None = None) -> None:
         self.model = model or _DEFAULT_MODEL
@@ -39,35 +123,86 @@ class EmbeddingClient:
         if not OpenAI and api_key:
             error = "OpenAI SDK is required when OPENAI_API_KEY is set"
             raise RuntimeError(error)
-        self._client = OpenAI(api_key=api_key) if (OpenAI and api_key) else None
+        self._client = get_openai_client()
 
     @property
     def dimension(self) -> int:
         return _EMBEDDING_DIMENSION
 
+    @property
+    def source(self) -> str:
+        """Identify what produces this client's vectors: the model, or the offline fallback."""
+        return self.model if self._client else f"offline-blake2b:{self.model}"
+
     def embed(self, text: str) -> EmbeddingResult:
-        cleaned = text.strip()
-        if not cleaned:
-            return EmbeddingResult(vector=[0.0] * self.dimension, model=self.model)
-        if self._client:
-            response = self._client.embeddings.create(model=self.model, input=[cleaned])
-            vector = response.data[0].embedding
-            return EmbeddingResult(vector=vector, model=self.model)
-        return EmbeddingResult(vector=self._offline_embedding(cleaned), model=self.model)
-
-    def _offline_embedding(self, text: str) -> list[float]:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: Sequence[str]) -> list[EmbeddingResult]:
+        """Embed several texts, preserving input order.
+
+        Duplicate and cached texts are resolved locally, and texts another
+        thread is already embedding are awaited rather than re-sent; the rest
+        go to the API in batches of ``EMBEDDING_BATCH_SIZE``, up to
+        ``EMBEDDING_CONCURRENCY`` of them at a time.
+        """
+        cleaned = [text.strip() for text in texts]
+        vectors: dict[str, np.ndarray] = {}
+        lookup: dict[_CacheKey, str] = {}
+        for text in dict.fromkeys(cleaned):
+            if not text:
+                vectors[text] = _ZERO_VECTOR
+            elif not self._client:
+                vectors[text] = self._offline_embedding(text)
+            else:
+                lookup[_CACHE.key(self.model, text)] = text
+
+        if lookup:
+            cached, owned, waiting = _CACHE.reserve(list(lookup))
+            for key, vector in cached.items():
+                vectors[lookup[key]] = vector
+            batches = [owned[start : start + _BATCH_SIZE] for start in range(0, len(owned), _BATCH_SIZE)]
+            inputs = [[lookup[key] for key in batch] for batch in batches]
+            try:
+                if len(batches) > 1:
+                    responses = _request_executor().map(self._request_embeddings, inputs)
+                else:
+                    responses = map(self._request_embeddings, inputs)
+                for batch, fetched in zip(batches, responses, strict=True):
+                    for key, vector in zip(batch, fetched, strict=True):
+                        _CACHE.fulfil(key, vector)
+                        vectors[lookup[key]] = vector
+            except BaseException as exc:
+                _CACHE.abandon(owned, exc)
+                raise
+            for key, future in waiting.items():
+                vectors[lookup[key]] = future.result()
+
+        return [EmbeddingResult(vector=vectors[text], model=self.model) for text in cleaned]
+
+    def _request_embeddings(self, texts: list[str]) -> list[np.ndarray]:
+        """Issue a single embeddings request; results come back in input order.
+
+        The raw response body is decoded with orjson and each base64 vector is
+        read straight into a float32 buffer, skipping the SDK's per-item pydantic
+        models.
+        """
+        assert self._client is not None
+        raw = self._client.embeddings.with_raw_response.create(
+            model=self.model,
+            input=texts,
+            encoding_format="base64",
+        )
+        data = orjson.loads(raw.content)["data"]
+        data.sort(key=itemgetter("index"))
+        return [np.frombuffer(base64.b64decode(item["embedding"]), dtype=np.float32) for item in data]
+
+    def _offline_embedding(self, text: str) -> np.ndarray:
         """Create a deterministic embedding without network access."""
-        digest = hashlib.sha256(text.encode("utf-8")).digest()
-        seed = int.from_bytes(digest[:4], "little", signed=False)
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=4).digest()
+        seed = int.from_bytes(digest, "little", signed=False)
         rng = np.random.default_rng(seed)
         vector = rng.normal(size=self.dimension)
         norm = np.linalg.norm(vector)
         if norm == 0:
-            return [0.0] * self.dimension
-        normalised = (vector / norm).astype(float)
-        return normalised.tolist()
-
-def embedding_to_pgvector(values: Sequence[float]) -> str:
-    """Format a python sequence so Postgres can cast it to ``vector``."""
-    formatted = ",".join(f"{float(value):.10f}" for value in values)
-    return f"[{formatted}]"
+            return _ZERO_VECTOR
+        return (vector / norm).astype(np.float32)
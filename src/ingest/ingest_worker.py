@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+import os
+from pathlib import Path
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Any
+
+from src import config
+from src.ingest.pdf_ingest import ingest_pdf
+from src.utils.database import (
+    claim_ingestion_run,
+    remember_ingested_document,
+    renew_ingestion_lease,
+    requeue_stale_ingestion_runs,
+    update_ingestion_status,
+)
+from src.utils.storage import download_file_fn
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+logger = config.LOGGER
+
+
+class LeaseLostError(RuntimeError):
+    """Raised inside a run whose lease was re-queued or re-claimed by another worker."""
+
+
+@contextmanager
+def _hold_lease(run_id: str, attempt: int) -> Iterator[threading.Event]:
+    """
+    Renew the run's lease from a background thread until the block exits.
+
+    A run whose lease stops being renewed (the process died or restarted) is
+    re-queued by the next drain once ``INGEST_LEASE_SECONDS`` pass. Renewals are
+    fenced to this claim's ``attempt``; the yielded event is set, and renewal
+    stops, once one finds the run no longer belongs to this worker.
+    """
+    interval = max(1.0, min(config.INGEST_HEARTBEAT_SECONDS, config.INGEST_LEASE_SECONDS / 3))
+    stop = threading.Event()
+    lost = threading.Event()
+
+    def renew() -> None:
+        while not stop.wait(interval):
+            try:
+                if not renew_ingestion_lease(run_id, attempt):
+                    logger.warning("Lost lease on ingestion run %s (attempt %d)", run_id, attempt)
+                    lost.set()
+                    return
+            except Exception as exc:
+                logger.warning("Failed to renew lease for ingestion run %s: %s", run_id, exc)
+
+    heartbeat = threading.Thread(target=renew, name="chatieee-ingest-lease", daemon=True)
+    heartbeat.start()
+    try:
+        yield lost
+    finally:
+        stop.set()
+        heartbeat.join()
+
+
+@contextmanager
+def _local_pdf(payload: dict[str, Any]) -> Iterator[str]:
+    """
+    Yield a local path to the run's PDF.
+
+    The instance that accepted the upload still has it at ``pdf_path``; any
+    other instance (or the same one after a restart wiped its disk) downloads
+    the staged copy at ``pdf_uri`` to a temporary file for the run.
+    """
+    pdf_path = payload.get("pdf_path")
+    if pdf_path and Path(pdf_path).is_file():
+        yield pdf_path
+        return
+    pdf_uri = payload.get("pdf_uri")
+    if not pdf_uri:
+        raise FileNotFoundError(f"PDF file not found and no staged copy recorded: {pdf_path}")
+    fd, temp_path = tempfile.mkstemp(suffix=".pdf", prefix="chatieee-ingest-")
+    os.close(fd)
+    try:
+        logger.info("Downloading staged PDF %s for ingestion", pdf_uri)
+        download_file_fn(pdf_uri, temp_path)
+        yield temp_path
+    finally:
+        Path(temp_path).unlink(missing_ok=True)
+
+
+def process_ingestion_run(run_id: str, document_id: int, payload: dict[str, Any], attempt: int) -> None:
+    """
+    Run `ingest_pdf` for a claimed ingestion run and record the outcome.
+
+    ``attempt`` identifies the claim; if its lease is lost mid-run, ingestion
+    stops at the next stage and the outcome is left to the newer claim.
+    """
+
+    def checkpoint() -> None:
+        if lost.is_set():
+            raise LeaseLostError(f"Ingestion run {run_id} attempt {attempt} lost its lease")
+
+    try:
+        with _hold_lease(run_id, attempt) as lost, _local_pdf(payload) as pdf_path:
+            ingest_pdf(
+                pdf_path=pdf_path,
+                external_id=payload["external_id"],
+                title=payload["title"],
+                description=payload.get("description"),
+                source_uri=payload.get("source_uri"),
+                check_strikeouts=bool(payload.get("check_strikeouts")),
+                checksum=payload.get("checksum"),
+                checkpoint=checkpoint,
+            )
+            checkpoint()
+        if not update_ingestion_status(run_id, "completed", attempt=attempt):
+            logger.warning("Ingestion run %s attempt %d finished after losing its claim", run_id, attempt)
+            return
+        if payload.get("checksum"):
+            remember_ingested_document(payload["checksum"], document_id)
+        logger.info("Ingestion run %s completed successfully", run_id)
+    except LeaseLostError as e:
+        logger.warning("%s; stopping", e)
+    except Exception as e:
+        logger.error("Ingestion run %s failed: %s", run_id, e, exc_info=True)
+        update_ingestion_status(run_id, "failed", str(e), attempt=attempt)
+
+
+def drain_ingestion_queue() -> int:
+    """
+    Claim and process queued ingestion runs until none are left.
+
+    Submitted to the ingest work channel at startup, whenever a run is queued,
+    and every ``INGEST_LEASE_SECONDS`` from the API lifespan. Before each claim,
+    runs whose lease expired are re-queued (or failed after
+    ``INGEST_MAX_ATTEMPTS``), so work interrupted by a restart is picked up
+    again. Several drains may run at once; `claim_ingestion_run` hands each run
+    to exactly one of them. Returns the number of runs processed.
+    """
+    processed = 0
+    while True:
+        try:
+            requeued = requeue_stale_ingestion_runs(config.INGEST_LEASE_SECONDS, config.INGEST_MAX_ATTEMPTS)
+            if requeued:
+                logger.info("Recovered %d abandoned ingestion runs", requeued)
+            run = claim_ingestion_run()
+        except Exception as exc:
+            logger.error("Failed to claim queued ingestion run: %s", exc, exc_info=True)
+            return processed
+        if run is None:
+            return processed
+        logger.info("Claimed ingestion run %s (attempt %d)", run["id"], run["attempts"])
+        process_ingestion_run(str(run["id"]), int(run["document_id"]), run["payload"], int(run["attempts"]))
+        processed += 1
@@ -10,25 +10,38 @@ Usage (example):
 
 This script:
   - Computes a checksum for the PDF.
-  - Extracts per-page text and tables via pdfplumber.
+  - Extracts per-page text via PDFium (pdfplumber when filtering strikeouts)
+    and tables via pdfplumber.
   - Builds body chunks (~max_chars) and table chunks.
   - Upserts rag_document and replaces its rag_chunk rows.
 """
 
-from collections.abc import Callable, Sequence
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
 import hashlib
 import inspect
 from io import BytesIO
+import mmap
+import multiprocessing
 from pathlib import Path
 import re
 from typing import Any
 
+import numpy as np
 import pdfplumber
-from pdfplumber.page import Page
+from pdfplumber.page import Page, test_proposed_bbox
+from pdfplumber.utils import chars_to_textmap
+import psycopg
+import pypdfium2 as pdfium
 
 from src import config
 from src.ingest.embed_and_update_chunks import embed_and_update_chunks
 from src.utils.database import (
+    borrow_connection,
     insert_figures,
     replace_chunks,
     replace_document_pages,
@@ -52,6 +65,9 @@ TABLE_LABEL_RE = re.compile(
     r"^\s*(TABLE\.?\s*(?:[A-Z]+(?:[.\-]\s*)?)?\d+(?:[.\-–]\d+)*(?:[A-Za-z]+)?)\s*(?=[—–])",
     re.IGNORECASE,
 )
+FIGURE_PREFIX_RE = re.compile(r"^fig(?:ure)?\.?\s*", re.IGNORECASE)
+WHITESPACE_RE = re.compile(r"\s+")
+UNSAFE_NAME_CHARS_RE = re.compile(r"[^A-Za-z0-9]+")
 
 CAPTION_LINE_GAP = 8.0  # Max vertical gap (points) allowed between caption lines
 MIN_FIGURE_HEIGHT = 40.0
@@ -66,6 +82,101 @@ TABLE_LABEL_SCAN_HEIGHT = 42.0
 CAPTION_SCAN_HEIGHT = 90.0
 
 
+@dataclass(slots=True)
+class FigureCandidate:
+    """A figure located on a page, ready to render."""
+    figure_label: str
+    caption_text: str
+    bbox: tuple[float, float, float, float]
+    # Index into page.images for raw-image fallbacks.
+    image_index: int | None = None
+
+
+@dataclass(slots=True)
+class PageFigures:
+    """
+    Figures detected on one page.
+
+    ``labels`` are the figure labels detection checked against the labels
+    already extracted, and ``seen`` the subset it treated as extracted; the
+    result is only valid for a caller whose extracted labels agree on those.
+    ``fallback`` is None when captioned figures were found and raw images
+    were not searched.
+    """
+    captioned: list[FigureCandidate]
+    fallback: list[FigureCandidate] | None
+    labels: frozenset[str]
+    seen: frozenset[str]
+
+
+@dataclass(slots=True)
+class PageExtraction:
+    """Body paragraphs, tables and figures taken from one parse of a page."""
+    paragraphs: list[str]
+    tables: list[dict[str, Any]]
+    figures: PageFigures
+
+
+@dataclass(slots=True)
+class PageText:
+    """
+    Text lookups over small regions of one page.
+
+    `extract_within` returns what ``page.within_bbox(bbox).extract_text(
+    x_tolerance=2, y_tolerance=2)`` would, but selects the characters with a
+    NumPy mask over boxes gathered on first use, instead of cropping every
+    object on the page for each region.
+    """
+    page: Page
+    _boxes: np.ndarray | None = field(default=None, init=False)
+
+    def extract_within(self, bbox: tuple[float, float, float, float]) -> str:
+        test_proposed_bbox(bbox, self.page.bbox)
+        chars = self.page.chars
+        if self._boxes is None:
+            self._boxes = np.array(
+                [(char["x0"], char["top"], char["x1"], char["bottom"]) for char in chars],
+                dtype=np.float64,
+            ).reshape(-1, 4)
+        boxes = self._boxes
+        widths = boxes[:, 2] - boxes[:, 0]
+        heights = boxes[:, 3] - boxes[:, 1]
+        # Same test as pdfplumber's within_bbox: fully inside, not a point.
+        inside = (
+            (boxes[:, 0] >= bbox[0])
+            & (boxes[:, 1] >= bbox[1])
+            & (boxes[:, 2] <= bbox[2])
+            & (boxes[:, 3] <= bbox[3])
+            & (widths >= 0)
+            & (heights >= 0)
+            & (widths + heights > 0)
+        )
+        selected = [chars[idx] for idx in np.flatnonzero(inside).tolist()]
+        return chars_to_textmap(
+            selected,
+            layout_bbox=bbox,
+            layout_width=bbox[2] - bbox[0],
+            layout_height=bbox[3] - bbox[1],
+            x_tolerance=2,
+            y_tolerance=2,
+        ).as_string
+
+
+@contextmanager
+def _borrow_pdf(path: str, pdf: pdfplumber.PDF | None = None) -> Iterator[pdfplumber.PDF]:
+    """
+    Yield ``pdf`` when the caller already opened the document, otherwise open ``path``.
+
+    Lets the ingest steps share one handle instead of each re-reading the
+    document's page tree.
+    """
+    if pdf is not None:
+        yield pdf
+        return
+    with pdfplumber.open(path) as opened:
+        yield opened
+
+
 def _remove_margins(
     page: Page,
     left_margin: float = LEFT_MARGIN_WIDTH,
@@ -104,50 +215,84 @@ def _remove_margins(
 
 
 def _group_words_into_lines(words: list[dict[str, Any]], line_tol: float = 2.5) -> list[dict[str, Any]]:
-    """Group pdfplumber words into lines in reading order."""
-    if not words:
+    """
+    Group pdfplumber words into lines in reading order.
+
+    Coordinates are pulled into one NumPy array so the sort and the per-line
+    bounding boxes run as array operations; only the line-break scan, which
+    compares each word against its line's running top, stays a loop over floats.
+    """
+    kept = [word for word in words if (word.get("text") or "").strip()]
+    if not kept:
         return []
 
+    coords = np.array(
+        [(word["x0"], word["x1"], word["top"], word["bottom"]) for word in kept],
+        dtype=np.float64,
+    )
+    rounded_tops = np.array([round(word["top"], 1) for word in kept], dtype=np.float64)
+    order = np.lexsort((coords[:, 0], rounded_tops))
+    coords = coords[order]
+
+    tops = coords[:, 2].tolist()
+    starts = [0]
+    line_top = tops[0]
+    for idx in range(1, len(tops)):
+        top = tops[idx]
+        if abs(top - line_top) > line_tol:
+            starts.append(idx)
+            line_top = top
+        elif top < line_top:
+            line_top = top
+
+    boundaries = np.array(starts, dtype=np.intp)
+    x0s = np.minimum.reduceat(coords[:, 0], boundaries).tolist()
+    x1s = np.maximum.reduceat(coords[:, 1], boundaries).tolist()
+    line_tops = np.minimum.reduceat(coords[:, 2], boundaries).tolist()
+    bottoms = np.maximum.reduceat(coords[:, 3], boundaries).tolist()
+
+    ordered = [kept[i] for i in order.tolist()]
+    starts.append(len(ordered))
     lines: list[dict[str, Any]] = []
-    sorted_words = sorted(words, key=lambda w: (round(w["top"], 1), w["x0"]))
-    for word in sorted_words:
-        text = (word.get("text") or "").strip()
+    for line_idx in range(len(boundaries)):
+        line_words = ordered[starts[line_idx] : starts[line_idx + 1]]
+        text = " ".join(w["text"] for w in sorted(line_words, key=lambda w: w["x0"])).strip()
         if not text:
             continue
+        lines.append(
+            {
+                "words": line_words,
+                "top": line_tops[line_idx],
+                "bottom": bottoms[line_idx],
+                "x0": x0s[line_idx],
+                "x1": x1s[line_idx],
+                "text": text,
+            }
+        )
+    return lines
 
-        if not lines or abs(float(word["top"]) - lines[-1]["top"]) > line_tol:
-            lines.append(
-                {
-                    "words": [word],
-                    "top": float(word["top"]),
-                    "bottom": float(word["bottom"]),
-                    "x0": float(word["x0"]),
-                    "x1": float(word["x1"]),
-                }
-            )
-            continue
 
-        line = lines[-1]
-        line["words"].append(word)
-        line["top"] = min(line["top"], float(word["top"]))
-        line["bottom"] = max(line["bottom"], float(word["bottom"]))
-        line["x0"] = min(line["x0"], float(word["x0"]))
-        line["x1"] = max(line["x1"], float(word["x1"]))
+def _extract_page_words(page: Page) -> list[dict[str, Any]]:
+    """Extract the words used by figure detection; run once per page and shared."""
+    try:
+        return page.extract_words(x_tolerance=2, y_tolerance=2)
+    except TypeError:
+        return page.extract_words()
 
-    for line in lines:
-        ordered_words = sorted(line["words"], key=lambda w: w["x0"])
-        line["text"] = " ".join(w["text"] for w in ordered_words).strip()
 
-    return [line for line in lines if line["text"]]
+def _has_caption_dash(page: Page) -> bool:
+    """
+    Cheap precheck for `_extract_caption_candidates`.
 
+    FIGURE_LABEL_RE only matches a label followed by an em or en dash, and
+    word text is built from the page's chars, so a page with neither dash
+    cannot have a caption and word extraction can be skipped.
+    """
+    return any("—" in char["text"] or "–" in char["text"] for char in page.chars)
 
-def _extract_caption_candidates(page: Page) -> list[dict[str, Any]]:
-    """Detect figure captions by locating lines that start with 'Figure'."""
-    try:
-        words = page.extract_words(x_tolerance=2, y_tolerance=2)
-    except TypeError:
-        words = page.extract_words()
 
+def _extract_caption_candidates(words: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Detect figure captions by locating lines that start with 'Figure'."""
     lines = _group_words_into_lines(words)
     captions: list[dict[str, Any]] = []
     idx = 0
@@ -190,54 +335,62 @@ def _extract_caption_candidates(page: Page) -> list[dict[str, Any]]:
     return captions
 
 
-def _gather_vector_boxes(page: Page) -> list[tuple[float, float, float, float]]:
-    """Collect bounding boxes for shapes (rects/lines/curves) drawn on a page."""
-    boxes: list[tuple[float, float, float, float]] = []
-
-    for rect in getattr(page, "rects", []):
-        boxes.append((float(rect["x0"]), float(rect["top"]), float(rect["x1"]), float(rect["bottom"])))
-
-    for line in getattr(page, "lines", []):
-        x0 = min(float(line["x0"]), float(line["x1"]))
-        x1 = max(float(line["x0"]), float(line["x1"]))
-        top = min(float(line["y0"]), float(line["y1"]))
-        bottom = max(float(line["y0"]), float(line["y1"]))
-        boxes.append((x0, top, x1, bottom))
+def _gather_vector_boxes(page: Page) -> np.ndarray:
+    """Collect ``(x0, top, x1, bottom)`` boxes for shapes (rects/lines/curves) drawn on a page."""
+    rects = getattr(page, "rects", [])
+    rect_boxes = np.array(
+        [(rect["x0"], rect["top"], rect["x1"], rect["bottom"]) for rect in rects],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+
+    lines = getattr(page, "lines", [])
+    ends = np.array(
+        [(line["x0"], line["y0"], line["x1"], line["y1"]) for line in lines],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+    line_boxes = np.column_stack(
+        (
+            np.minimum(ends[:, 0], ends[:, 2]),
+            np.minimum(ends[:, 1], ends[:, 3]),
+            np.maximum(ends[:, 0], ends[:, 2]),
+            np.maximum(ends[:, 1], ends[:, 3]),
+        )
+    )
 
-    for curve in getattr(page, "curves", []):
-        pts = curve.get("pts")
-        if not pts:
-            continue
-        xs = [float(pt[0]) for pt in pts]
-        ys = [float(pt[1]) for pt in pts]
-        boxes.append((min(xs), min(ys), max(xs), max(ys)))
+    # All curve points go into one array; reduceat takes each curve's extent.
+    curve_pts = [pts for curve in getattr(page, "curves", []) if (pts := curve.get("pts"))]
+    curve_boxes = np.empty((0, 4))
+    if curve_pts:
+        points = np.array([(pt[0], pt[1]) for pts in curve_pts for pt in pts], dtype=np.float64)
+        starts = np.cumsum([0] + [len(pts) for pts in curve_pts[:-1]])
+        curve_boxes = np.hstack(
+            (np.minimum.reduceat(points, starts, axis=0), np.maximum.reduceat(points, starts, axis=0))
+        )
 
-    return boxes
+    return np.vstack((rect_boxes, line_boxes, curve_boxes))
 
 
-def _collect_image_boxes(page: Page) -> list[tuple[float, float, float, float]]:
-    """Collect bounding boxes for raster images embedded in the page."""
-    boxes: list[tuple[float, float, float, float]] = []
-    for image in getattr(page, "images", []):
-        boxes.append(
-            (
-                float(image["x0"]),
-                float(image["top"]),
-                float(image["x1"]),
-                float(image["bottom"]),
-            )
-        )
-    return boxes
+def _collect_image_boxes(page: Page) -> np.ndarray:
+    """Collect ``(x0, top, x1, bottom)`` boxes for raster images embedded in the page."""
+    return np.array(
+        [(image["x0"], image["top"], image["x1"], image["bottom"]) for image in getattr(page, "images", [])],
+        dtype=np.float64,
+    ).reshape(-1, 4)
 
 
 def _build_figure_bbox(
     page: Page,
     caption_bbox: tuple[float, float, float, float],
-    graphic_boxes: list[tuple[float, float, float, float]],
+    graphic_boxes: np.ndarray,
     min_top: float,
 ) -> tuple[float, float, float, float] | None:
-    """Estimate the figure bounding box located above a caption."""
-    if not graphic_boxes:
+    """
+    Estimate the figure bounding box located above a caption.
+
+    ``graphic_boxes`` is an ``(n, 4)`` array of ``(x0, top, x1, bottom)`` rows,
+    built once per page; each caption selects and reduces it in NumPy.
+    """
+    if not len(graphic_boxes):
         return None
 
     caption_top = caption_bbox[1]
@@ -248,27 +401,21 @@ def _build_figure_bbox(
     if search_bottom <= search_top:
         return None
 
-    region_boxes: list[tuple[float, float, float, float]] = []
-    for x0, top, x1, bottom in graphic_boxes:
-        if bottom <= search_top or top >= search_bottom:
-            continue
-        region_boxes.append(
-            (
-                max(0.0, x0),
-                max(search_top, top),
-                min(float(page.width), x1),
-                min(search_bottom, bottom),
-            )
-        )
-
-    if not region_boxes:
+    region = graphic_boxes[(graphic_boxes[:, 3] > search_top) & (graphic_boxes[:, 1] < search_bottom)]
+    if not len(region):
         return None
 
+    # Each box is clamped to the search region before the union is taken;
+    # the clamps are monotonic, so clamping the reduced extremes is equivalent.
+    x0 = max(0.0, float(region[:, 0].min()))
+    top = max(search_top, float(region[:, 1].min()))
+    x1 = min(float(page.width), float(region[:, 2].max()))
+    bottom = min(search_bottom, float(region[:, 3].max()))
     bbox = (
-        max(0.0, min(b[0] for b in region_boxes) - 6),
-        max(search_top, min(b[1] for b in region_boxes) - 6),
-        min(float(page.width), max(b[2] for b in region_boxes) + 6),
-        min(search_bottom, max(b[3] for b in region_boxes) + 6),
+        max(0.0, x0 - 6),
+        max(search_top, top - 6),
+        min(float(page.width), x1 + 6),
+        min(search_bottom, bottom + 6),
     )
 
     height = bbox[3] - bbox[1]
@@ -293,6 +440,7 @@ def _build_textual_figure_bbox(
     page: Page,
     caption_bbox: tuple[float, float, float, float],
     min_top: float,
+    words: list[dict[str, Any]],
 ) -> tuple[float, float, float, float] | None:
     """Fallback: infer a bounding box using word positions above the caption."""
     caption_top = caption_bbox[1]
@@ -302,11 +450,6 @@ def _build_textual_figure_bbox(
     if search_bottom <= search_top:
         return None
 
-    try:
-        words = page.extract_words(x_tolerance=2, y_tolerance=2)
-    except TypeError:
-        words = page.extract_words()
-
     region_words: list[tuple[float, float, float, float]] = []
     for word in words:
         x0 = float(word.get("x0", 0.0))
@@ -347,7 +490,7 @@ def _build_textual_figure_bbox(
 
 
 def _has_table_label_above(
-    page: Page,
+    page_text: PageText,
     bbox: tuple[float, float, float, float],
     scan_height: float = TABLE_LABEL_SCAN_HEIGHT,
 ) -> bool:
@@ -358,10 +501,10 @@ def _has_table_label_above(
     label_box = (
         max(0.0, x0 - 10.0),
         max(0.0, top - scan_height),
-        min(float(page.width), x1 + 10.0),
+        min(float(page_text.page.width), x1 + 10.0),
         max(0.1, top - (scan_height * 0.25)),
     )
-    text = page.within_bbox(label_box).extract_text(x_tolerance=2, y_tolerance=2) or ""
+    text = page_text.extract_within(label_box)
     label_found = TABLE_LABEL_RE.search(clean_text(text))
     if label_found:
         logger.info(
@@ -395,57 +538,45 @@ def _render_bbox(page: Page, bbox: tuple[float, float, float, float]) -> bytes:
     )
     cropped = page.crop(clipped).to_image(resolution=200)
     buffer = BytesIO()
-    cropped.save(buffer, format="PNG")
+    cropped.save(buffer, format="PNG", compress_level=config.PNG_COMPRESS_LEVEL)
     return buffer.getvalue()
 
 
 def _extract_caption_text_from_bbox(
-    page: Page,
+    page_text: PageText,
     bbox: tuple[float, float, float, float],
     max_height: float = CAPTION_SCAN_HEIGHT,
 ) -> str:
     """Pull text immediately below a bounding box as a fallback caption."""
+    page_height = float(page_text.page.height)
     caption_box = (
         bbox[0],
-        min(float(page.height), bbox[3]),
+        min(page_height, bbox[3]),
         bbox[2],
-        min(float(page.height), bbox[3] + max_height),
+        min(page_height, bbox[3] + max_height),
     )
-    text = page.within_bbox(caption_box).extract_text(x_tolerance=2, y_tolerance=2) or ""
+    text = page_text.extract_within(caption_box)
     return clean_text(text)
 
 
-def _persist_figure(
-    document_id: int,
-    page_num: int,
-    figure_label: str,
-    caption_text: str,
-    image_bytes: bytes,
-    upload_image_fn: Callable[..., str],
-) -> None:
-    """Upload the rendered figure and insert into rag_figure."""
-    safe_label = re.sub(r"[^A-Za-z0-9]+", "_", figure_label).strip("_") or "figure"
+def _figure_row(document_id: int, page_num: int, figure: FigureCandidate) -> tuple[dict[str, Any], str]:
+    """Build the rag_figure row for a rendered figure and the name to upload its image under."""
+    safe_label = UNSAFE_NAME_CHARS_RE.sub("_", figure.figure_label).strip("_") or "figure"
     suggested_name = f"doc{document_id}_p{page_num}_{safe_label}.png"
-    image_uri = upload_image_fn(image_bytes, suggested_name)
+    row = {
+        "figure_label": figure.figure_label,
+        "page_number": page_num,
+        "caption": figure.caption_text.strip(),
+        "metadata": {},
+    }
+    return row, suggested_name
 
-    insert_figures(
-        document_id=document_id,
-        figures=[
-            {
-                "figure_label": figure_label,
-                "page_number": page_num,
-                "caption": caption_text.strip(),
-                "image_uri": image_uri,
-                "metadata": {},
-            }
-        ],
-    )
 
 def _render_full_page(page: Page, resolution: int = 180) -> bytes:
     """Render a full (already cropped if desired) PDF page to PNG bytes."""
     snapshot = page.to_image(resolution=resolution)
     buffer = BytesIO()
-    snapshot.save(buffer, format="PNG")
+    snapshot.save(buffer, format="PNG", compress_level=config.PNG_COMPRESS_LEVEL)
     return buffer.getvalue()
 
 
@@ -454,10 +585,24 @@ def persist_document_pages(
     document_id: int,
     upload_image_fn: Callable[..., str],
     resolution: int = 180,
+    conn: psycopg.Connection | None = None,
+    pdf: pdfplumber.PDF | None = None,
 ) -> None:
-    """Render and upload each page, then upsert rag_document_page rows."""
+    """
+    Render and upload each page, then upsert rag_document_page rows.
+
+    Pages are rendered serially (pdfplumber is not thread-safe) while uploads
+    run on a small thread pool, so network latency overlaps rendering. At most
+    two uploads per worker are in flight to bound the PNG bytes held in memory.
+    """
     page_payloads: list[dict[str, Any]] = []
-    with pdfplumber.open(pdf_path) as pdf:
+    uploads: list[Future[str]] = []
+    workers = max(1, config.IMAGE_UPLOAD_WORKERS)
+    window = workers * 2
+    with (
+        _borrow_pdf(pdf_path, pdf) as pdf,
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chatieee-upload") as executor,
+    ):
         for page_num, page in enumerate(pdf.pages, start=1):
             logger.info("Rendering page image for document_id=%d page=%d", document_id, page_num)
             marginless_page = _remove_margins(page)
@@ -468,12 +613,13 @@ def persist_document_pages(
                 logger.error(error)
                 raise RuntimeError(error) from exc
 
+            if len(uploads) >= window:
+                uploads[-window].result()
             suggested_name = f"doc{document_id}_page_{page_num:04d}.png"
-            image_uri = upload_image_fn(image_bytes, suggested_name, folder="pages")
+            uploads.append(executor.submit(upload_image_fn, image_bytes, suggested_name, folder="pages"))
             page_payloads.append(
                 {
                     "page_number": page_num,
-                    "image_uri": image_uri,
                     "metadata": {
                         "width": float(marginless_page.width),
                         "height": float(marginless_page.height),
@@ -483,26 +629,38 @@ def persist_document_pages(
                 }
             )
 
-    replace_document_pages(document_id=document_id, pages=page_payloads)
+        for payload, upload in zip(page_payloads, uploads, strict=True):
+            payload["image_uri"] = upload.result()
+
+    replace_document_pages(document_id=document_id, pages=page_payloads, conn=conn)
 
 
 def compute_checksum(path: str) -> str:
     """
     Compute SHA-256 checksum of the file for change detection.
+
+    The file is memory-mapped and hashed in one call, so the bytes are read
+    straight from the page cache with no intermediate buffer copies. Files
+    that cannot be mapped (empty files, some network filesystems) go through
+    `hashlib.file_digest`, which still hashes in OpenSSL with the GIL released.
     """
-    hasher = hashlib.sha256()
     with Path(path).open("rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            hasher.update(chunk)
-    return hasher.hexdigest()
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        with mapped:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            return hashlib.sha256(mapped).hexdigest()
 
 
 def clean_text(text: str) -> str:
     """
     Normalize whitespace and strip leading/trailing spaces.
     """
-    # Replace multiple whitespace with single spaces
-    return " ".join(text.split()).strip()
+    # split() with no argument already drops leading/trailing whitespace.
+    return " ".join(text.split())
 
 
 STRIKEOUT_BBOX_PADDING = 1.5
@@ -652,20 +810,143 @@ def extract_body_paragraphs(page: Page, check_strikeouts: bool = True) -> list[s
     content_page = _remove_margins(page)
     working_page = _page_without_strikeouts(content_page) if check_strikeouts else content_page
     raw = working_page.extract_text(x_tolerance=3, y_tolerance=3)
+    return _split_paragraphs(raw)
+
+
+def extract_body_paragraphs_pdfium(
+    page: pdfium.PdfPage,
+    left_margin: float = LEFT_MARGIN_WIDTH,
+    top_margin: float = TOP_MARGIN_HEIGHT,
+    bottom_margin: float = BOTTOM_MARGIN_HEIGHT,
+) -> list[str]:
+    """
+    Extract body text paragraphs from a PDFium page.
+
+    Same margin handling as `extract_body_paragraphs`, but the text comes from
+    PDFium's native text layer instead of pdfminer's pure-Python layout pass.
+    Cannot filter strikeouts (no per-character objects).
+    """
+    left, bottom, right, top = page.get_cropbox()
+    width = right - left
+    height = top - bottom
+    if width > 0.0 and height > 0.0:
+        left += min(max(0.0, left_margin), max(width - 1.0, 0.0))
+        crop_top = top - min(max(0.0, top_margin), max(height - 1.0, 0.0))
+        crop_bottom = bottom + min(max(0.0, bottom_margin), max(height - 1.0, 0.0))
+        if crop_bottom < crop_top:
+            top, bottom = crop_top, crop_bottom
+
+    textpage = page.get_textpage()
+    try:
+        raw = textpage.get_text_bounded(left=left, bottom=bottom, right=right, top=top)
+    finally:
+        textpage.close()
+    return _split_paragraphs(raw.replace("\r\n", "\n"))
+
+
+def _split_paragraphs(raw: str | None) -> list[str]:
+    """Split extracted page text into cleaned paragraphs."""
     if not raw:
         logger.info("No text extracted from page.")
         return []
 
-    # pdfplumber usually uses '\n' between lines. We treat '\n\n' as paragraph
-    # breaks where they exist, otherwise we just treat the whole page as one block.
-    paras = raw.split("\n\n") if "\n\n" in raw else [raw]
+    # Extractors usually use '\n' between lines. We treat '\n\n' as paragraph
+    # breaks where they exist; without one, split() yields the whole page as
+    # one block.
+    return [cleaned for block in raw.split("\n\n") if (cleaned := clean_text(block))]
+
+
+def extract_pages(
+    path: str,
+    pdf: pdfplumber.PDF,
+    check_strikeouts: bool,
+) -> list[PageExtraction]:
+    """
+    Extract body paragraphs, tables and figure locations for every page.
+
+    Each page is parsed once for all three. Strikeout filtering needs
+    pdfplumber's per-character objects; otherwise body text is read through
+    PDFium, which skips pdfminer's layout analysis.
+
+    pdfminer is pure Python and holds the GIL, so on large documents the pages
+    are split into contiguous blocks extracted in worker processes.
+    """
+    page_count = len(pdf.pages)
+    workers = min(
+        config.PDF_EXTRACT_WORKERS,
+        page_count // max(config.PDF_EXTRACT_MIN_PAGES_PER_WORKER, 1),
+    )
+    if workers > 1:
+        try:
+            return _extract_pages_parallel(path, page_count, workers, check_strikeouts)
+        except (BrokenProcessPool, OSError) as exc:
+            logger.error("Parallel page extraction failed, falling back to serial: %s", exc)
+
+    return _extract_pages(path, pdf.pages, check_strikeouts)
+
+
+def _extract_pages_parallel(
+    path: str,
+    page_count: int,
+    workers: int,
+    check_strikeouts: bool,
+) -> list[PageExtraction]:
+    """Extract all pages using ``workers`` processes, in page order."""
+    block = -(-page_count // workers)
+    starts = list(range(0, page_count, block))
+    stops = [min(start + block, page_count) for start in starts]
+    logger.info("Extracting %d pages across %d processes", page_count, len(starts))
+
+    # Ingestion runs on worker threads, so avoid forking a multi-threaded process.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(starts), mp_context=context) as executor:
+        blocks = executor.map(
+            _extract_page_range,
+            [path] * len(starts),
+            starts,
+            stops,
+            [check_strikeouts] * len(starts),
+        )
+        return [page for block_pages in blocks for page in block_pages]
 
-    paragraphs: list[str] = []
-    for p in paras:
-        cleaned = clean_text(p)
-        if cleaned:
-            paragraphs.append(cleaned)
-    return paragraphs
+
+def _extract_page_range(path: str, start: int, stop: int, check_strikeouts: bool) -> list[PageExtraction]:
+    """Extract zero-based pages ``[start, stop)`` of the PDF at ``path``."""
+    with pdfplumber.open(path, pages=list(range(start + 1, stop + 1))) as pdf:
+        return _extract_pages(path, pdf.pages, check_strikeouts)
+
+
+def _extract_pages(path: str, pages: Sequence[Page], check_strikeouts: bool) -> list[PageExtraction]:
+    """
+    Extract a run of consecutive pages.
+
+    Figure labels found on earlier pages of the run are treated as already
+    extracted; `extract_figures_from_pdf` re-detects any page where that
+    assumption turns out wrong. Each page's parsed objects are released once
+    it is done, since rendering later on does not need them.
+    """
+    results: list[PageExtraction] = []
+    seen_labels: set[str] = set()
+    document = None if check_strikeouts else pdfium.PdfDocument(path)
+    try:
+        for page in pages:
+            if document is None:
+                paragraphs = extract_body_paragraphs(page, check_strikeouts=True)
+            else:
+                pdfium_page = document[page.page_number - 1]
+                try:
+                    paragraphs = extract_body_paragraphs_pdfium(pdfium_page)
+                finally:
+                    pdfium_page.close()
+            figures = _detect_page_figures(page, page.page_number, seen_labels)
+            seen_labels.update(figure.figure_label for figure in figures.captioned)
+            seen_labels.update(figure.figure_label for figure in figures.fallback or ())
+            results.append(PageExtraction(paragraphs, extract_table_texts(page), figures))
+            page.close()
+    finally:
+        if document is not None:
+            document.close()
+    return results
 
 
 def extract_table_texts(page: Page) -> list[dict[str, Any]]:
@@ -717,136 +998,246 @@ def extract_table_texts(page: Page) -> list[dict[str, Any]]:
 
     return table_chunks
 
+def _detect_page_figures(page: Page, page_num: int, seen_labels: set[str]) -> PageFigures:
+    """
+    Locate the figures on a page without rendering them.
+
+    Labels in ``seen_labels``, and repeats of a label found earlier on the
+    page, are skipped. Raw image objects are searched only when no captioned
+    figure is found.
+    """
+    claimed = set(seen_labels)
+    considered: set[str] = set()
+    page_text = PageText(page)
+    captioned = _detect_captioned_figures(page, page_num, claimed, considered, page_text)
+    fallback = None if captioned else _detect_fallback_figures(page, claimed, considered, page_text)
+    return PageFigures(
+        captioned=captioned,
+        fallback=fallback,
+        labels=frozenset(considered),
+        seen=frozenset(considered & seen_labels),
+    )
+
+
+def _detect_captioned_figures(
+    page: Page,
+    page_num: int,
+    claimed: set[str],
+    considered: set[str],
+    page_text: PageText,
+) -> list[FigureCandidate]:
+    """Find figures above caption lines; adds found labels to ``claimed``."""
+    if not _has_caption_dash(page):
+        return []
+    words = _extract_page_words(page)
+    captions = _extract_caption_candidates(words)
+    graphic_boxes = np.empty((0, 4))
+    if captions:
+        graphic_boxes = np.vstack((_gather_vector_boxes(page), _collect_image_boxes(page)))
+    min_top = 0.0
+    figures: list[FigureCandidate] = []
+
+    for caption in captions:
+        figure_label = caption["figure_label"]
+        considered.add(figure_label)
+        if figure_label in claimed:
+            continue
+
+        bbox = _build_figure_bbox(page, caption["caption_bbox"], graphic_boxes, min_top)
+        min_top = max(min_top, caption["caption_bbox"][3] + 2)
+        used_textual_bbox = False
+        if not bbox:
+            bbox = _build_textual_figure_bbox(page, caption["caption_bbox"], min_top, words)
+            used_textual_bbox = bool(bbox)
+        if not bbox:
+            logger.info("Unable to determine bounding box for %s on page %d", figure_label, page_num)
+            continue
+
+        if used_textual_bbox:
+            logger.info("Derived textual bounding box for %s on page %d", figure_label, page_num)
+
+        if _has_table_label_above(page_text, bbox):
+            logger.info(
+                "Skipping %s on page %d because a table caption was detected above the candidate region.",
+                figure_label,
+                page_num,
+            )
+            continue
+
+        figures.append(FigureCandidate(figure_label, caption["caption_text"], bbox))
+        claimed.add(figure_label)
+
+    return figures
+
+
+def _detect_fallback_figures(
+    page: Page,
+    claimed: set[str],
+    considered: set[str],
+    page_text: PageText,
+) -> list[FigureCandidate]:
+    """Find raw images with a figure label just below them; adds found labels to ``claimed``."""
+    figures: list[FigureCandidate] = []
+    for idx, img in enumerate(page.images):
+        bbox = (
+            float(img["x0"]),
+            float(img["top"]),
+            float(img["x1"]),
+            float(img["bottom"]),
+        )
+        if _has_table_label_above(page_text, bbox):
+            continue
+
+        caption_text = _extract_caption_text_from_bbox(page_text, bbox)
+        match = FIGURE_LABEL_RE.search(caption_text)
+        if not match:
+            continue
+
+        figure_label = normalise_figure_label(match.group(1))
+        considered.add(figure_label)
+        if figure_label in claimed:
+            continue
+
+        figures.append(FigureCandidate(figure_label, caption_text or "", bbox, image_index=idx))
+        claimed.add(figure_label)
+
+    return figures
+
+
 def extract_figures_from_pdf(
     pdf_path: str,
     document_id: int,
     upload_image_fn: Callable[..., str],
+    conn: psycopg.Connection | None = None,
+    pdf: pdfplumber.PDF | None = None,
+    detected: Sequence[PageFigures] | None = None,
 ) -> None:
     """
     Extract figure images and captions from the PDF and insert into rag_figure.
 
     upload_image_fn(image_bytes, suggested_name) -> image_uri
+
+    ``detected`` takes per-page results from `extract_pages`, so only
+    rendering happens here. A page is detected again when those results
+    assumed a different set of already-extracted labels (e.g. a duplicate
+    label across worker blocks, or a figure that failed to render).
+
+    As in `persist_document_pages`, uploads overlap rendering on a small
+    thread pool; the rows are upserted together once every upload finishes.
     """
 
     seen_labels: set[str] = set()
-
-    with pdfplumber.open(pdf_path) as pdf:
+    figure_rows: list[dict[str, Any]] = []
+    uploads: list[Future[str]] = []
+    workers = max(1, config.IMAGE_UPLOAD_WORKERS)
+    window = workers * 2
+
+    with (
+        _borrow_pdf(pdf_path, pdf) as pdf,
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chatieee-upload") as executor,
+    ):
         for page_num, page in enumerate(pdf.pages, start=1):
             logger.info("Extracting figures from document_id=%d, page=%d", document_id, page_num)
-            captions = _extract_caption_candidates(page)
-            vector_boxes = _gather_vector_boxes(page) if captions else []
-            image_boxes = _collect_image_boxes(page) if captions else []
-            graphic_boxes = vector_boxes + image_boxes
-            min_top = 0.0
-            figures_on_page = 0
-
-            for caption in captions:
-                figure_label = caption["figure_label"]
-                if figure_label in seen_labels:
-                    continue
-
-                bbox = _build_figure_bbox(page, caption["caption_bbox"], graphic_boxes, min_top)
-                min_top = max(min_top, caption["caption_bbox"][3] + 2)
-                used_textual_bbox = False
-                if not bbox:
-                    bbox = _build_textual_figure_bbox(page, caption["caption_bbox"], min_top)
-                    used_textual_bbox = bool(bbox)
-                if not bbox:
-                    logger.info("Unable to determine bounding box for %s on page %d", figure_label, page_num)
-                    continue
-
-                if used_textual_bbox:
-                    logger.info("Derived textual bounding box for %s on page %d", figure_label, page_num)
-
-                if _has_table_label_above(page, bbox):
-                    logger.info(
-                        "Skipping %s on page %d because a table caption was detected above the candidate region.",
-                        figure_label,
-                        page_num,
-                    )
-                    continue
-
-                try:
-                    image_bytes = _render_bbox(page, bbox)
-                except Exception as exc:
-                    logger.error(
-                        "Failed to render figure %s on page %d: %s",
-                        figure_label,
-                        page_num,
-                        exc,
-                    )
-                    continue
-
-                _persist_figure(
-                    document_id=document_id,
-                    page_num=page_num,
-                    figure_label=figure_label,
-                    caption_text=caption["caption_text"],
-                    image_bytes=image_bytes,
-                    upload_image_fn=upload_image_fn,
+            figures = detected[page_num - 1] if detected is not None else None
+            if figures is None or figures.seen != figures.labels & seen_labels:
+                figures = _detect_page_figures(page, page_num, seen_labels)
+
+            rendered = _render_figures(page, page_num, figures.captioned)
+            if not rendered:
+                logger.info(
+                    "No caption-derived figures found on page %d, falling back to raw image objects.",
+                    page_num,
                 )
-                figures_on_page += 1
-                seen_labels.add(figure_label)
+                fallback = figures.fallback
+                if fallback is None:
+                    # Captioned figures were found but none rendered.
+                    fallback = _detect_fallback_figures(page, set(seen_labels), set(), PageText(page))
+                rendered = _render_figures(page, page_num, fallback)
 
-            if figures_on_page:
-                continue
+            for figure, image_bytes in rendered:
+                seen_labels.add(figure.figure_label)
+                if len(uploads) >= window:
+                    uploads[-window].result()
+                row, suggested_name = _figure_row(document_id, page_num, figure)
+                uploads.append(executor.submit(upload_image_fn, image_bytes, suggested_name))
+                figure_rows.append(row)
 
-            logger.info(
-                "No caption-derived figures found on page %d, falling back to raw image objects.",
-                page_num,
-            )
-            for idx, img in enumerate(page.images):
-                bbox = (
-                    float(img["x0"]),
-                    float(img["top"]),
-                    float(img["x1"]),
-                    float(img["bottom"]),
-                )
-                if _has_table_label_above(page, bbox):
-                    continue
+        for row, upload in zip(figure_rows, uploads, strict=True):
+            row["image_uri"] = upload.result()
 
-                caption_text = _extract_caption_text_from_bbox(page, bbox)
-                match = FIGURE_LABEL_RE.search(caption_text)
-                if not match:
-                    continue
+    insert_figures(document_id=document_id, figures=figure_rows, conn=conn)
 
-                figure_label = normalise_figure_label(match.group(1))
-                if figure_label in seen_labels:
-                    continue
 
-                try:
-                    image_bytes = _render_bbox(page, bbox)
-                except Exception as exc:
-                    logger.error(
-                        "Failed to render fallback image index=%d on page %d: %s",
-                        idx,
-                        page_num,
-                        exc,
-                    )
-                    continue
-
-                _persist_figure(
-                    document_id=document_id,
-                    page_num=page_num,
-                    figure_label=figure_label,
-                    caption_text=caption_text or "",
-                    image_bytes=image_bytes,
-                    upload_image_fn=upload_image_fn,
+def _render_figures(
+    page: Page,
+    page_num: int,
+    figures: Sequence[FigureCandidate],
+) -> list[tuple[FigureCandidate, bytes]]:
+    """Render detected figures to PNG bytes, logging and skipping any that fail."""
+    rendered: list[tuple[FigureCandidate, bytes]] = []
+    for figure in figures:
+        try:
+            image_bytes = _render_bbox(page, figure.bbox)
+        except Exception as exc:
+            if figure.image_index is None:
+                logger.error(
+                    "Failed to render figure %s on page %d: %s",
+                    figure.figure_label,
+                    page_num,
+                    exc,
+                )
+            else:
+                logger.error(
+                    "Failed to render fallback image index=%d on page %d: %s",
+                    figure.image_index,
+                    page_num,
+                    exc,
                 )
-                seen_labels.add(figure_label)
+            continue
+        rendered.append((figure, image_bytes))
+    return rendered
 
+@lru_cache(maxsize=1024)
 def normalise_figure_label(raw: str) -> str:
     """Normalise figure labels to 'FIGURE <label>' without stray punctuation."""
-    cleaned = re.sub(r"(?i)^fig(?:ure)?\.?\s*", "", raw or "").strip()
-    cleaned = re.sub(r"\s+", " ", cleaned)
+    cleaned = FIGURE_PREFIX_RE.sub("", raw or "").strip()
+    cleaned = WHITESPACE_RE.sub(" ", cleaned)
     if not cleaned:
         return "FIGURE"
     return f"FIGURE {cleaned.upper()}"
 
-def build_chunks_from_pdf(path: str, check_strikeouts: bool = True) -> list[dict[str, Any]]:
+def _body_chunk(chunk_index: int, page_start: int | None, page_end: int | None,
+                paragraphs: list[str]) -> dict[str, Any]:
+    """
+    Build a body chunk dict from buffered paragraphs.
+
+    Paragraphs come from `_split_paragraphs`, already stripped and non-empty,
+    so the joined text needs no further trimming or emptiness check.
+    """
+    return {
+        "chunk_index": chunk_index,
+        "page_start": page_start,
+        "page_end": page_end,
+        "content": " ".join(paragraphs),
+        "heading": None,
+        "chunk_type": "body",
+        "metadata": {},
+        "embedding": None,
+    }
+
+
+def build_chunks_from_pdf(
+    path: str,
+    check_strikeouts: bool = True,
+    pdf: pdfplumber.PDF | None = None,
+    pages: Sequence[PageExtraction] | None = None,
+) -> list[dict[str, Any]]:
     """
     Parse the PDF and build chunk dicts ready for DB insertion.
 
+    Pass ``pages`` (from `extract_pages`) to build from an extraction the
+    caller already ran instead of parsing the PDF again.
+
     Returns a list of:
       {
         "chunk_index": int,
@@ -859,107 +1250,94 @@ def build_chunks_from_pdf(path: str, check_strikeouts: bool = True) -> list[dict
         "embedding": None,   # placeholder, to be filled later
       }
     """
-    chunks: list[dict[str, Any]] = []
-
-    with pdfplumber.open(path) as pdf:
-
-        # --- Body chunks (text) ---
-        buffer: list[str] = []
-        buffer_page_start: int | None = None
-        buffer_page_end: int | None = None
+    if pages is None:
+        with _borrow_pdf(path, pdf) as pdf:
+            pages = extract_pages(path, pdf, check_strikeouts)
+    return list(iter_chunks(pages))
 
-        chunk_index = 0
 
-        for page_num, page in enumerate(pdf.pages, start=1):
-            paragraphs = extract_body_paragraphs(page, check_strikeouts=check_strikeouts)
-            if not paragraphs:
-                continue
-
-            for para in paragraphs:
-                if buffer_page_start is None:
-                    buffer_page_start = page_num
-                buffer_page_end = page_num
+def iter_chunks(pages: Sequence[PageExtraction]) -> Iterator[dict[str, Any]]:
+    """
+    Yield the chunks `build_chunks_from_pdf` returns, one at a time.
 
-                prospective_len = sum(len(p) for p in buffer) + len(buffer) + len(para)
-                if prospective_len > MAX_CHARS_PER_BODY_CHUNK and buffer:
-                    # Flush current buffer as a chunk
-                    body_text = " ".join(buffer).strip()
-                    if body_text:
-                        chunks.append(
-                            {
-                                "chunk_index": chunk_index,
-                                "page_start": buffer_page_start,
-                                "page_end": buffer_page_end,
-                                "content": body_text,
-                                "heading": None,
-                                "chunk_type": "body",
-                                "metadata": {},
-                                "embedding": None,
-                            }
-                        )
-                        chunk_index += 1
-
-                    # Reset buffer for next chunk
-                    buffer = [para]
-                    buffer_page_start = page_num
-                    buffer_page_end = page_num
-                else:
-                    buffer.append(para)
-
-        # Flush remainder body buffer
-        if buffer:
-            body_text = " ".join(buffer).strip()
-            if body_text:
-                chunks.append(
-                    {
-                        "chunk_index": chunk_index,
-                        "page_start": buffer_page_start,
-                        "page_end": buffer_page_end,
-                        "content": body_text,
-                        "heading": None,
-                        "chunk_type": "body",
-                        "metadata": {},
-                        "embedding": None,
-                    }
-                )
+    `ingest_pdf` passes this straight to `replace_chunks`, so each chunk is
+    written to COPY as soon as it is built.
+    """
+    # --- Body chunks (text) ---
+    buffer: list[str] = []
+    # Joined length of the buffer plus one separator per paragraph, kept
+    # incrementally so each paragraph is O(1) instead of re-summing.
+    buffer_len = 0
+    buffer_page_start: int | None = None
+    buffer_page_end: int | None = None
+
+    chunk_index = 0
+
+    for page_num, page in enumerate(pages, start=1):
+        for para in page.paragraphs:
+            if buffer_page_start is None:
+                buffer_page_start = page_num
+            buffer_page_end = page_num
+
+            prospective_len = buffer_len + len(para)
+            if prospective_len > MAX_CHARS_PER_BODY_CHUNK and buffer:
+                # Flush current buffer as a chunk
+                yield _body_chunk(chunk_index, buffer_page_start, buffer_page_end, buffer)
                 chunk_index += 1
 
-        # --- Table chunks ---
-        # We do a second pass for tables so they get their own chunks.
-        for page_num, page in enumerate(pdf.pages, start=1):
-            table_infos = extract_table_texts(page)
-            for table_info in table_infos:
-                table_text = table_info["text"]
-                if not table_text:
-                    continue
-
-                chunks.append(
-                    {
-                        "chunk_index": chunk_index,
-                        "page_start": page_num,
-                        "page_end": page_num,
-                        "content": table_text,
-                        "heading": None,
-                        "chunk_type": "table",
-                        "metadata": {
-                            "table_index_on_page": table_info["metadata"][
-                                "table_index_on_page"
-                            ],
-                        },
-                        "embedding": None,
-                    }
-                )
-                chunk_index += 1
+                # Reset buffer for next chunk
+                buffer = [para]
+                buffer_len = len(para) + 1
+                buffer_page_start = page_num
+                buffer_page_end = page_num
+            else:
+                buffer.append(para)
+                buffer_len += len(para) + 1
+
+    # Flush remainder body buffer
+    if buffer:
+        yield _body_chunk(chunk_index, buffer_page_start, buffer_page_end, buffer)
+        chunk_index += 1
+
+    # --- Table chunks ---
+    # Tables come after the body so they get their own chunks.
+    for page_num, page in enumerate(pages, start=1):
+        for table_info in page.tables:
+            table_text = table_info["text"]
+            if not table_text:
+                continue
 
-    return chunks
+            yield {
+                "chunk_index": chunk_index,
+                "page_start": page_num,
+                "page_end": page_num,
+                "content": table_text,
+                "heading": None,
+                "chunk_type": "table",
+                "metadata": {
+                    "table_index_on_page": table_info["metadata"]["table_index_on_page"],
+                },
+                "embedding": None,
+            }
+            chunk_index += 1
 
 def ingest_pdf(pdf_path: str = "documents/*.pdf",
                external_id: str | None = None,
                title: str | None = None,
                description: str | None = None,
                source_uri: str | None = None,
-               check_strikeouts: bool = True) -> None:
-    """Ingest a PDF document, chunk it, store in DB, and extract figures."""
+               check_strikeouts: bool = True,
+               checksum: str | None = None,
+               checkpoint: Callable[[], None] | None = None) -> None:
+    """
+    Ingest a PDF document, chunk it, store in DB, and extract figures.
+
+    Pass ``checksum`` when it is already known (e.g. hashed while the upload
+    streamed in) to skip re-reading the file. ``checkpoint`` is called before
+    each write stage; the queue worker passes one that raises once it has lost
+    the run's lease, so a superseded run stops instead of writing over the
+    claim that replaced it.
+    """
 
     if not Path(pdf_path).is_file():
         error = f"PDF file not found: {pdf_path}"
@@ -969,48 +1347,60 @@ def ingest_pdf(pdf_path: str = "documents/*.pdf",
     external_id = external_id or Path(pdf_path).name
     title = title or Path(pdf_path).stem
 
-    checksum = compute_checksum(pdf_path)
+    checksum = checksum or compute_checksum(pdf_path)
+    checkpoint = checkpoint or (lambda: None)
 
+    # Pages are parsed once: text, tables and figure locations are all taken
+    # from that pass, and the page-image and figure steps only render. One
+    # connection serves every write instead of a connect per helper.
     with pdfplumber.open(pdf_path) as pdf:
         total_pages = len(pdf.pages)
+        pages = extract_pages(pdf_path, pdf, check_strikeouts)
+        checkpoint()
+        with borrow_connection() as conn:
+            # Upsert the document row
+            document_id = upsert_document(
+                external_id=external_id,
+                title=title,
+                description=description,
+                source_uri=source_uri,
+                checksum=checksum,
+                total_pages=total_pages,
+                metadata={},
+                conn=conn,
+            )
 
-    # Upsert the document row
-    document_id = upsert_document(
-        external_id=external_id,
-        title=title,
-        description=description,
-        source_uri=source_uri,
-        checksum=checksum,
-        total_pages=total_pages,
-        metadata={},
-    )
-
-    chunks = build_chunks_from_pdf(pdf_path, check_strikeouts=check_strikeouts)
-
-    # Upsert chunks (replace all existing chunks for this document)
-    replace_chunks(document_id=document_id, chunks=chunks)
-
-    log_info = f"chunks_inserted={len(chunks)}"
-    logger.info(log_info)
+            checkpoint()
+            # Upsert chunks (replace all existing chunks for this document)
+            chunk_count = replace_chunks(document_id=document_id, chunks=iter_chunks(pages), conn=conn)
 
-    persist_document_pages(
-        pdf_path=pdf_path,
-        document_id=document_id,
-        upload_image_fn=upload_image_fn,
-    )
+            log_info = f"chunks_inserted={chunk_count}"
+            logger.info(log_info)
 
-    log_info = f"Extracting figures for document_id={document_id}"
-    logger.info(log_info)
+            checkpoint()
+            persist_document_pages(
+                pdf_path=pdf_path,
+                document_id=document_id,
+                upload_image_fn=upload_image_fn,
+                conn=conn,
+                pdf=pdf,
+            )
 
-    extract_figures_from_pdf(
-        pdf_path=pdf_path,
-        document_id=document_id,
-        upload_image_fn=upload_image_fn,
-    )
+            checkpoint()
+            log_info = f"Extracting figures for document_id={document_id}"
+            logger.info(log_info)
+
+            extract_figures_from_pdf(
+                pdf_path=pdf_path,
+                document_id=document_id,
+                upload_image_fn=upload_image_fn,
+                conn=conn,
+                pdf=pdf,
+                detected=[page.figures for page in pages],
+            )
 
-    log_info = f"Ingested document_id={document_id}, total_pages={total_pages}"
-    logger.info(log_info)
-    log_info = f"chunks_inserted={len(chunks)}"
+    log_info = f"Ingested document_id={document_id}, total_pages={total_pages}, chunks_inserted={chunk_count}"
     logger.info(log_info)
 
+    checkpoint()
     embed_and_update_chunks()
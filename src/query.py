@@ -2,33 +2,34 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 import json
-import os
 import re
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
     from collections.abc import Iterable, Sequence
 
+from pgvector.psycopg import HalfVector
 import psycopg
 from psycopg import sql as _sql
 from psycopg.rows import dict_row
 
 from src import config
-from src.ingest.embedding import EmbeddingClient, embedding_to_pgvector
+from src.ingest.embedding import EmbeddingClient
+from src.utils.database import pooled_connection
+from src.utils.openai_client import OpenAI, get_openai_client
 
 logger = config.LOGGER
 
-try:  # pragma: no
-    from openai import OpenAI
-except Exception:  # pragma: no cover
+if OpenAI is None:  # pragma: no cover
     logger.info("OpenAI library not found, LLM reranking will be disabled")
-    OpenAI = None  # type: ignore
 
 # Allow appendix-style labels like "FIG. B-5", "FIGURE 9-22C", and dotted forms.
 FIGURE_RE = re.compile(
     r"\b(FIG(?:URE)?\.?\s*(?:[A-Z]+(?:[.\-]\s*)?)?\d+(?:[.\-–]\d+)*(?:[A-Za-z]+)?)",
     re.IGNORECASE,
 )
+FIGURE_PREFIX_RE = re.compile(r"^fig(?:ure)?\.?\s*", re.IGNORECASE)
+WHITESPACE_RE = re.compile(r"\s+")
 
 @dataclass(slots=True)
 class ChunkMatch:
@@ -100,9 +101,8 @@ class PageMatch:
 
 class LLMReranker:
     def __init__(self, model: str | None = None) -> None:
-        api_key = os.getenv("OPENAI_API_KEY")
-        self._client = OpenAI(api_key=api_key) if (OpenAI and api_key) else None
-        self.model = model or os.getenv("RAG_RERANK_MODEL", "gpt-5-mini")
+        self._client = get_openai_client()
+        self.model = model or config.RERANK_MODEL
     @property
     def available(self) -> bool:
         return self._client is not None
@@ -230,7 +230,9 @@ class AnswerGenerator:
             error = "OPENAI_API_KEY must be set to generate answers"
             logger.error(error)
             raise RuntimeError(error)
-        self._client = OpenAI(api_key=api_key)
+        client = get_openai_client()
+        assert client is not None
+        self._client = client
         self.model = model or config.ANSWER_MODEL
         self.verbosity = verbosity or config.DEFAULT_VERBOSITY
 
@@ -317,11 +319,11 @@ class AnswerGenerator:
 class HybridRetriever:
     VECTOR_QUERY = """
         SELECT id, document_id, page_start, page_end, content, metadata,
-               1 - (embedding <=> %(embedding)s::vector) AS similarity,
-               (embedding <=> %(embedding)s::vector) AS distance
+               1 - (embedding <=> %(embedding)s::halfvec) AS similarity,
+               (embedding <=> %(embedding)s::halfvec) AS distance
           FROM rag_chunk
          WHERE embedding IS NOT NULL
-      ORDER BY embedding <=> %(embedding)s::vector
+      ORDER BY embedding <=> %(embedding)s::halfvec
          LIMIT %(limit)s
     """
     LEXICAL_QUERY = """
@@ -343,14 +345,14 @@ class HybridRetriever:
         self.reranker = reranker or LLMReranker()
     def search(self, query: str, vector_k: int = 20, lexical_k: int = 20, final_k: int = 10) -> list[ChunkMatch]:
         query_embedding = self.embedder.embed(query)
-        vector_param = embedding_to_pgvector(query_embedding.vector)
-        with psycopg.connect(self.conninfo) as conn:
+        vector_param = HalfVector(query_embedding.vector)
+        with pooled_connection(self.conninfo) as conn:
             vector_results = self._vector_search(conn, vector_param, limit=vector_k)
             lexical_results = self._lexical_search(conn, query, limit=lexical_k)
         combined = self._combine_results(vector_results, lexical_results)
         reranked = self.reranker.rerank(query, combined)
         return reranked[:final_k]
-    def _vector_search(self, conn: psycopg.Connection[Any], vector_param: str, limit: int) -> list[ChunkMatch]:
+    def _vector_search(self, conn: psycopg.Connection[Any], vector_param: HalfVector, limit: int) -> list[ChunkMatch]:
         with conn.cursor(row_factory=dict_row) as cur:
             cur.execute(self.VECTOR_QUERY, {"embedding": vector_param, "limit": limit})
             rows = cur.fetchall()
@@ -411,8 +413,8 @@ def extract_figure_labels(text: str) -> list[str]:
     return sorted(labels)
 
 def normalise_figure_label(raw: str) -> str:
-    cleaned = re.sub(r"(?i)^fig(?:ure)?\.?\s*", "", raw or "").strip()
-    cleaned = re.sub(r"\s+", " ", cleaned)
+    cleaned = FIGURE_PREFIX_RE.sub("", raw or "").strip()
+    cleaned = WHITESPACE_RE.sub(" ", cleaned)
     if not cleaned:
         return "FIGURE"
     return f"FIGURE {cleaned.upper()}"
@@ -465,7 +467,7 @@ def get_pages_for_chunks(
         params.extend([doc_id, page_number])
 
     matches: list[PageMatch] = []
-    with psycopg.connect(conninfo) as conn, conn.cursor(row_factory=dict_row) as cur:
+    with pooled_connection(conninfo) as conn, conn.cursor(row_factory=dict_row) as cur:
         cur.execute(_sql.SQL(sql), params)  # type: ignore[arg-type]
         for row in cur:
             key = (row["document_id"], row["page_number"])
@@ -522,7 +524,7 @@ def get_figures_for_chunks(
         params.extend([doc_id, label])
 
     matches: list[FigureMatch] = []
-    with psycopg.connect(conninfo) as conn, conn.cursor(row_factory=dict_row) as cur:
+    with pooled_connection(conninfo) as conn, conn.cursor(row_factory=dict_row) as cur:
             cur.execute(_sql.SQL(sql), params) # type: ignore
             logger.info("Processing figure retrieval results")
             for row in cur:
@@ -20,7 +20,7 @@ import argparse
 from typing import Any
 
 from openai import OpenAI
-from pgvector.psycopg import Vector, register_vector
+from pgvector.psycopg import HalfVector, register_vector
 import psycopg
 
 from src import config
@@ -87,13 +87,13 @@ def fetch_chunks(
         rc.page_start,
         rc.page_end,
         rc.chunk_type,
-        (rc.embedding <-> %(query_vec)s) AS distance
+        (rc.embedding <=> %(query_vec)s) AS distance
     FROM rag_chunk rc
     JOIN rag_document rd
       ON rc.document_id = rd.id
     WHERE rc.embedding IS NOT NULL
     """
-    params: dict[str, Any] = {"query_vec": Vector(query_embedding), "limit": k}
+    params: dict[str, Any] = {"query_vec": HalfVector(query_embedding), "limit": k}
 
 
     if document_external_id:
@@ -101,7 +101,7 @@ def fetch_chunks(
         params["external_id"] = document_external_id
 
     base_sql += """
-    ORDER BY rc.embedding <-> %(query_vec)s
+    ORDER BY rc.embedding <=> %(query_vec)s
     LIMIT %(limit)s
     """
 
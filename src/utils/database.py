@@ -26,7 +26,7 @@ CREATE TABLE rag_chunk (
     content         TEXT NOT NULL,
     heading         TEXT,
     chunk_type      TEXT NOT NULL DEFAULT 'body',
-    embedding       vector(1536),
+    embedding       halfvec(1536),
     metadata        JSONB NOT NULL DEFAULT '{}'::jsonb,
     created_at      TIMESTAMPTZ NOT NULL DEFAULT now()
 );
@@ -36,22 +36,34 @@ CREATE UNIQUE INDEX idx_rag_chunk_document_index
 
 CREATE INDEX idx_rag_chunk_document_id
     ON rag_chunk (document_id);
+
+CREATE INDEX idx_rag_chunk_embedding_hnsw
+    ON rag_chunk USING hnsw (embedding halfvec_cosine_ops);
 """
 
 import asyncio
-from collections.abc import AsyncIterator, Iterable
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+import threading
+import time
 from typing import Any
 from uuid import uuid4
 
+import numpy as np
+from pgvector.psycopg import register_vector
 import psycopg
 from psycopg import OperationalError
 from psycopg.types.json import Jsonb
-from psycopg_pool import AsyncConnectionPool
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
 
 from src import config
 
 logger = config.LOGGER
 _pool: AsyncConnectionPool | None = None
+_sync_pool: ConnectionPool | None = None
+_sync_pool_lock = threading.Lock()
+_ingested_checksums: dict[str, tuple[int, float]] = {}
+_ingested_lock = threading.Lock()
 _MAX_RETRIES = 5
 _BASE_BACKOFF = 0.1
 _RECOVERABLE_SUBSTRINGS: tuple[str, ...] = (
@@ -73,6 +85,35 @@ def _jsonb(value: Any | None) -> Jsonb:
     """Wrap Python values so psycopg knows they target a JSONB column."""
     return Jsonb({} if value is None else value)
 
+_VECTOR_COMPONENT_FORMAT = "{:.8g}".format
+
+def _vector_literal(values: Sequence[float] | np.ndarray | str | None) -> str | None:
+    """Render an embedding in pgvector's text form (COPY text input cannot cast arrays).
+
+    NumPy arrays are unboxed with one ``tolist`` call rather than copied
+    element by element through ``float()``; eight significant digits keep
+    full float32 precision in shorter text than ``repr``.
+    """
+    if values is None or isinstance(values, str):
+        return values
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    return "[" + ",".join(map(_VECTOR_COMPONENT_FORMAT, values)) + "]"
+
+def _connection_kwargs(**kwargs: Any) -> dict[str, Any]:
+    """
+    Connection options shared by both pools.
+
+    Pooled connections are long-lived, so statements that repeat on them
+    (the retrieval queries, status lookups) are prepared server-side after
+    ``DB_PREPARE_THRESHOLD`` executions and skip parse/plan afterwards.
+    A negative threshold disables preparing, for poolers that do not
+    support prepared statements.
+    """
+    threshold = config.DB_PREPARE_THRESHOLD
+    kwargs["prepare_threshold"] = threshold if threshold >= 0 else None
+    return kwargs
+
 async def _reset_pool(bad_pool: AsyncConnectionPool | None) -> None:
     """Close and clear the cached pool so the next call recreates it."""
     global _pool
@@ -88,20 +129,37 @@ async def _reset_pool(bad_pool: AsyncConnectionPool | None) -> None:
 def init_pool() -> AsyncConnectionPool:
     """Initialize a global async connection pool.
 
+    The pool is created closed; call `open_pool` to start it.
+
     Returns:
         A configured `AsyncConnectionPool`.
     """
     global _pool
     if _pool is None:
         dsn = config.DATABASE_URL or ""
+        min_size = max(1, config.DB_POOL_MIN_SIZE)
         _pool = AsyncConnectionPool(
             conninfo=dsn,
-            min_size=1,
-            max_size=10,
-            kwargs={"autocommit": False},
+            min_size=min_size,
+            max_size=max(min_size, config.DB_POOL_MAX_SIZE),
+            max_idle=config.DB_POOL_MAX_IDLE,
+            kwargs=_connection_kwargs(autocommit=False),
+            open=False,
         )
     return _pool
 
+async def open_pool(wait: bool = False, timeout: float = 30.0) -> AsyncConnectionPool:
+    """Open the global pool if needed.
+
+    With ``wait=True`` this blocks until ``min_size`` connections are
+    established, so the first requests after startup do not pay the
+    TCP/TLS/auth handshake.
+    """
+    pool = init_pool()
+    if pool.closed:
+        await pool.open(wait=wait, timeout=timeout)
+    return pool
+
 async def reset_pool() -> None:
     """Explicitly reset the cached pool."""
     await _reset_pool(_pool)
@@ -116,7 +174,7 @@ async def get_conn() -> AsyncIterator[psycopg.AsyncConnection]:
     last_error: OperationalError | None = None
 
     while attempt < _MAX_RETRIES:
-        pool = init_pool()
+        pool = await open_pool()
         try:
             async with pool.connection() as conn, conn.transaction():
                 yield conn
@@ -156,9 +214,79 @@ def get_connection() -> psycopg.Connection:
         raise RuntimeError(error)
     return psycopg.connect(dsn)
 
+def get_sync_pool() -> ConnectionPool:
+    """
+    Return the process-wide synchronous pool used by the blocking query path.
+
+    Retrieval runs on worker threads, so it cannot use the async pool; this
+    pool gives those threads warm connections (and their prepared
+    statements) instead of a new connection per lookup. Connections register
+    the pgvector types once, so query vectors are sent in binary. It opens on
+    first use.
+    """
+    global _sync_pool
+    with _sync_pool_lock:
+        if _sync_pool is None:
+            dsn = config.DATABASE_URL
+            if not dsn:
+                error = "DATABASE_URL environment variable is not set"
+                logger.error(error)
+                raise RuntimeError(error)
+            _sync_pool = ConnectionPool(
+                conninfo=dsn,
+                min_size=1,
+                max_size=max(1, config.QUERY_WORKERS),
+                max_idle=config.DB_POOL_MAX_IDLE,
+                kwargs=_connection_kwargs(),
+                configure=register_vector,
+                open=True,
+            )
+        return _sync_pool
+
+def close_sync_pool() -> None:
+    """Close the synchronous pool if it was opened; called on API shutdown."""
+    global _sync_pool
+    with _sync_pool_lock:
+        if _sync_pool is not None:
+            _sync_pool.close()
+            _sync_pool = None
+
+@contextmanager
+def pooled_connection(conninfo: str | None = None) -> Iterator[psycopg.Connection]:
+    """
+    Borrow a connection from the synchronous pool; the transaction ends on exit.
+
+    A ``conninfo`` other than ``DATABASE_URL`` gets a dedicated connection,
+    since the pool only serves the configured database. Either way the
+    connection has the pgvector types registered.
+    """
+    if conninfo and conninfo != config.DATABASE_URL:
+        with psycopg.connect(conninfo) as conn:
+            register_vector(conn)
+            yield conn
+        return
+    with get_sync_pool().connection() as conn:
+        yield conn
+
+@contextmanager
+def borrow_connection(conn: psycopg.Connection | None = None) -> Iterator[psycopg.Connection]:
+    """
+    Yield ``conn`` when the caller already holds one, otherwise a new connection.
+
+    Lets a multi-step job (e.g. `ingest_pdf`) reuse one connection across
+    helpers instead of paying a TCP/TLS/auth handshake per call. A borrowed
+    connection is left open; an owned one is closed on exit.
+    """
+    if conn is not None:
+        yield conn
+        return
+    with get_connection() as owned:
+        yield owned
+
 def insert_figures(
     document_id: int,
     figures: list[dict[str, Any]],
+    conn: psycopg.Connection | None = None,
 ) -> None:
     """
     Insert one or more figures for a document.
@@ -196,21 +324,56 @@ def insert_figures(
         image_uri   = EXCLUDED.image_uri,
         metadata    = EXCLUDED.metadata;
     """
+    params = [
+        {
+            "document_id": document_id,
+            "figure_label": fig["figure_label"],
+            "page_number": fig.get("page_number"),
+            "caption": fig.get("caption"),
+            "image_uri": fig["image_uri"],
+            "metadata": _jsonb(fig.get("metadata")),
+        }
+        for fig in figures
+    ]
     logger.info("Upserting %d figures for document_id=%d", len(figures), document_id)
-    with get_connection() as conn:
+    with borrow_connection(conn) as conn:
         with conn.cursor() as cur:
-            for fig in figures:
-                params = {
-                    "document_id": document_id,
-                    "figure_label": fig["figure_label"],
-                    "page_number": fig.get("page_number"),
-                    "caption": fig.get("caption"),
-                    "image_uri": fig["image_uri"],
-                    "metadata": _jsonb(fig.get("metadata")),
-                }
-                cur.execute(sql, params)
+            # executemany pipelines the statements: one round trip for the batch.
+            cur.executemany(sql, params)
         conn.commit()
 
+_UPSERT_DOCUMENT_SQL = """
+INSERT INTO rag_document (
+    external_id, title, description, source_type,
+    source_uri, checksum, total_pages, metadata, updated_at
+)
+VALUES (
+    %(external_id)s, %(title)s, %(description)s, 'pdf',
+    %(source_uri)s, %(checksum)s, %(total_pages)s, %(metadata)s, now()
+)
+ON CONFLICT (external_id)
+DO UPDATE SET
+    title       = EXCLUDED.title,
+    description = EXCLUDED.description,
+    source_uri  = EXCLUDED.source_uri,
+    checksum    = EXCLUDED.checksum,
+    total_pages = EXCLUDED.total_pages,
+    metadata    = EXCLUDED.metadata,
+    updated_at  = now()
+RETURNING id;
+"""
+
+
+def _upsert_document_row(cur: psycopg.Cursor, params: dict[str, Any]) -> int:
+    cur.execute(_UPSERT_DOCUMENT_SQL, params)
+    row = cur.fetchone()
+    if row is None:
+        error = "Failed to insert or update document"
+        logger.error(error)
+        raise RuntimeError(error)
+    return int(row[0])
+
+
 def upsert_document(
     external_id: str,
     title: str | None,
@@ -219,33 +382,13 @@ def upsert_document(
     checksum: str,
     total_pages: int,
     metadata: dict[str, Any] | None,
+    conn: psycopg.Connection | None = None,
 ) -> int:
     """
     Upsert a row into rag_document and return document_id.
 
     external_id should be a stable key (e.g., filename, or your own ID).
     """
-    sql = """
-    INSERT INTO rag_document (
-        external_id, title, description, source_type,
-        source_uri, checksum, total_pages, metadata, updated_at
-    )
-    VALUES (
-        %(external_id)s, %(title)s, %(description)s, 'pdf',
-        %(source_uri)s, %(checksum)s, %(total_pages)s, %(metadata)s, now()
-    )
-    ON CONFLICT (external_id)
-    DO UPDATE SET
-        title       = EXCLUDED.title,
-        description = EXCLUDED.description,
-        source_uri  = EXCLUDED.source_uri,
-        checksum    = EXCLUDED.checksum,
-        total_pages = EXCLUDED.total_pages,
-        metadata    = EXCLUDED.metadata,
-        updated_at  = now()
-    RETURNING id;
-    """
-
     params = {
         "external_id": external_id,
         "title": title,
@@ -256,26 +399,86 @@ def upsert_document(
         "metadata": _jsonb(metadata),
     }
 
-    with get_connection() as conn:
+    with borrow_connection(conn) as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, params)
-            row = cur.fetchone()
-            if row is None:
-                error = "Failed to insert or update document"
-                logger.error(error)
-                raise RuntimeError(error)
-            (doc_id,) = row
+            doc_id = _upsert_document_row(cur, params)
         conn.commit()
-    return int(doc_id)
+    _forget_ingested_document(doc_id)
+    return doc_id
+
+
+def remember_ingested_document(checksum: str, document_id: int) -> None:
+    """Record that ``document_id`` is fully ingested with this checksum."""
+    if config.INGESTED_CHECKSUM_TTL <= 0:
+        return
+    with _ingested_lock:
+        _ingested_checksums[checksum] = (document_id, time.monotonic() + config.INGESTED_CHECKSUM_TTL)
+
+
+def _forget_ingested_document(document_id: int) -> None:
+    """Drop cached checksums for a document whose row is being rewritten."""
+    with _ingested_lock:
+        stale = [key for key, (doc_id, _) in _ingested_checksums.items() if doc_id == document_id]
+        for key in stale:
+            del _ingested_checksums[key]
+
+
+def find_ingested_document(checksum: str) -> int | None:
+    """
+    Return the ID of a document whose stored PDF has this checksum and whose
+    chunks are current, or None.
+
+    A document counts as ingested when it has chunks and its latest ingestion
+    run (if any) completed; queued, processing, or failed runs mean the stored
+    chunks may not reflect the checksum yet.
+
+    Hits are remembered in-process for ``INGESTED_CHECKSUM_TTL`` seconds, so
+    repeat uploads skip the database round-trip. The TTL bounds staleness when
+    another instance rewrites the document.
+    """
+    with _ingested_lock:
+        cached = _ingested_checksums.get(checksum)
+        if cached is not None:
+            if cached[1] > time.monotonic():
+                return cached[0]
+            del _ingested_checksums[checksum]
+
+    sql = """
+    SELECT d.id
+    FROM rag_document d
+    WHERE d.checksum = %(checksum)s
+      AND EXISTS (SELECT 1 FROM rag_chunk c WHERE c.document_id = d.id)
+      AND COALESCE((
+            SELECT r.status
+            FROM rag_ingestion_run r
+            WHERE r.document_id = d.id
+            ORDER BY r.started_at DESC
+            LIMIT 1
+          ), 'completed') = 'completed'
+    ORDER BY d.updated_at DESC
+    LIMIT 1;
+    """
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(sql, {"checksum": checksum})
+        row = cur.fetchone()
+    if row is None:
+        return None
+    remember_ingested_document(checksum, int(row[0]))
+    return int(row[0])
 
 
 def replace_chunks(
     document_id: int,
-    chunks: list[dict[str, Any]],
-) -> None:
+    chunks: Iterable[dict[str, Any]],
+    conn: psycopg.Connection | None = None,
+) -> int:
     """
     Delete existing chunks for the document and insert the new ones.
 
+    ``chunks`` may be a generator; rows are written to COPY as it yields them,
+    so the full chunk list never has to exist at once. Returns the number of
+    chunks written.
+
     Each chunk dict is expected to contain:
       - chunk_index: int
       - page_start: Optional[int]
@@ -289,8 +492,10 @@ def replace_chunks(
 
     delete_sql = "DELETE FROM rag_chunk WHERE document_id = %(document_id)s;"
 
-    insert_sql = """
-    INSERT INTO rag_chunk (
+    # COPY streams every row in one protocol exchange instead of a round-trip
+    # per INSERT.
+    copy_sql = """
+    COPY rag_chunk (
         document_id,
         chunk_index,
         page_start,
@@ -300,46 +505,42 @@ def replace_chunks(
         chunk_type,
         embedding,
         metadata
-    ) VALUES (
-        %(document_id)s,
-        %(chunk_index)s,
-        %(page_start)s,
-        %(page_end)s,
-        %(content)s,
-        %(heading)s,
-        %(chunk_type)s,
-        %(embedding)s,
-        %(metadata)s
-    );
+    ) FROM STDIN
     """
 
-    with get_connection() as conn:
+    with borrow_connection(conn) as conn:
         with conn.cursor() as cur:
             # Remove old chunks
             cur.execute(delete_sql, {"document_id": document_id})
 
             # Insert new chunks
-            for chunk in chunks:
-                params = {
-                    "document_id": document_id,
-                    "chunk_index": chunk["chunk_index"],
-                    "page_start": chunk.get("page_start"),
-                    "page_end": chunk.get("page_end"),
-                    "content": chunk["content"],
-                    "heading": chunk.get("heading"),
-                    "chunk_type": chunk.get("chunk_type", "body"),
-                    # embedding can be None for now; you can backfill later
-                    "embedding": chunk.get("embedding"),
-                    "metadata": _jsonb(chunk.get("metadata")),
-                }
-                cur.execute(insert_sql, params)
+            written = 0
+            with cur.copy(copy_sql) as copy:
+                for chunk in chunks:
+                    copy.write_row(
+                        (
+                            document_id,
+                            chunk["chunk_index"],
+                            chunk.get("page_start"),
+                            chunk.get("page_end"),
+                            chunk["content"],
+                            chunk.get("heading"),
+                            chunk.get("chunk_type", "body"),
+                            # embedding can be None for now; you can backfill later
+                            _vector_literal(chunk.get("embedding")),
+                            _jsonb(chunk.get("metadata")),
+                        )
+                    )
+                    written += 1
 
         conn.commit()
+    return written
 
 
 def replace_document_pages(
     document_id: int,
     pages: list[dict[str, Any]],
+    conn: psycopg.Connection | None = None,
 ) -> None:
     """
     Replace rag_document_page rows for a document with the provided payload.
@@ -350,31 +551,21 @@ def replace_document_pages(
       - metadata: dict[str, Any] | None
     """
     delete_sql = "DELETE FROM rag_document_page WHERE document_id = %(document_id)s;"
-    insert_sql = """
-    INSERT INTO rag_document_page (
-        document_id,
-        page_number,
-        image_uri,
-        metadata
-    ) VALUES (
-        %(document_id)s,
-        %(page_number)s,
-        %(image_uri)s,
-        %(metadata)s
-    );
-    """
+    copy_sql = "COPY rag_document_page (document_id, page_number, image_uri, metadata) FROM STDIN"
 
-    with get_connection() as conn:
+    with borrow_connection(conn) as conn:
         with conn.cursor() as cur:
             cur.execute(delete_sql, {"document_id": document_id})
-            for page in pages:
-                params = {
-                    "document_id": document_id,
-                    "page_number": page["page_number"],
-                    "image_uri": page["image_uri"],
-                    "metadata": _jsonb(page.get("metadata")),
-                }
-                cur.execute(insert_sql, params)
+            with cur.copy(copy_sql) as copy:
+                for page in pages:
+                    copy.write_row(
+                        (
+                            document_id,
+                            page["page_number"],
+                            page["image_uri"],
+                            _jsonb(page.get("metadata")),
+                        )
+                    )
         conn.commit()
 
 
@@ -391,49 +582,201 @@ def is_recoverable_operational_error(exc: BaseException) -> bool:
             return True
     return False
 
-def create_ingestion_run(document_id: int) -> str:
+_CREATE_INGESTION_RUN_SQL = """
+INSERT INTO rag_ingestion_run (id, document_id, status, payload, started_at)
+VALUES (%(id)s, %(document_id)s, 'queued', %(payload)s, now());
+"""
+
+
+def create_ingestion_run(document_id: int, payload: dict[str, Any] | None = None) -> str:
+    """
+    Create a new queued ingestion run record and return its ID (UUID).
+
+    ``payload`` holds everything a worker needs to process the run, including
+    the ``pdf_uri`` of the PDF staged in the bucket, so queued runs survive an
+    API restart and can be claimed by any instance.
+    """
+    run_id = str(uuid4())
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                _CREATE_INGESTION_RUN_SQL,
+                {"id": run_id, "document_id": document_id, "payload": _jsonb(payload)},
+            )
+        conn.commit()
+    return run_id
+
+def queue_document_ingestion(
+    external_id: str,
+    title: str | None,
+    description: str | None,
+    source_uri: str | None,
+    checksum: str,
+    payload: dict[str, Any],
+) -> tuple[int, str]:
     """
-    Create a new ingestion run record and return its ID (UUID).
+    Upsert the document row and queue its ingestion run in one transaction.
+
+    `find_ingested_document` treats a checksum as ingested when the document's
+    latest run is completed; committing the new checksum and its queued run
+    together keeps a concurrent identical upload from matching the new checksum
+    against the previous run. Returns ``(document_id, run_id)``.
     """
+    params = {
+        "external_id": external_id,
+        "title": title,
+        "description": description,
+        "source_uri": source_uri,
+        "checksum": checksum,
+        "total_pages": 0,
+        "metadata": _jsonb({}),
+    }
     run_id = str(uuid4())
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            doc_id = _upsert_document_row(cur, params)
+            cur.execute(
+                _CREATE_INGESTION_RUN_SQL,
+                {"id": run_id, "document_id": doc_id, "payload": _jsonb(payload)},
+            )
+        conn.commit()
+    _forget_ingested_document(doc_id)
+    return doc_id, run_id
+
+def claim_ingestion_run() -> dict[str, Any] | None:
+    """
+    Atomically claim the oldest queued ingestion run and mark it processing.
+
+    Uses ``FOR UPDATE SKIP LOCKED`` so concurrent workers (threads or API
+    instances) never claim the same run. Returns None when the queue is empty.
+    """
     sql = """
-    INSERT INTO rag_ingestion_run (id, document_id, status, started_at)
-    VALUES (%(id)s, %(document_id)s, 'processing', now());
+    UPDATE rag_ingestion_run
+    SET status = 'processing',
+        attempts = attempts + 1,
+        claimed_at = now()
+    WHERE id = (
+        SELECT id
+        FROM rag_ingestion_run
+        WHERE status = 'queued'
+        ORDER BY started_at
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id, document_id, payload, attempts;
     """
     with get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, {"id": run_id, "document_id": document_id})
+            cur.execute(sql)
+            row = cur.fetchone()
         conn.commit()
-    return run_id
+    if row is None:
+        return None
+    return {"id": row[0], "document_id": row[1], "payload": row[2] or {}, "attempts": row[3]}
+
+def renew_ingestion_lease(run_id: str, attempt: int) -> bool:
+    """
+    Refresh ``claimed_at`` on a run this worker is still processing.
+
+    ``attempt`` is the ``attempts`` value returned by `claim_ingestion_run` and
+    fences the update to that claim. Returns False when the run was re-queued,
+    re-claimed or finished meanwhile, i.e. this worker no longer owns it.
+    """
+    sql = """
+    UPDATE rag_ingestion_run
+    SET claimed_at = now()
+    WHERE id = %(id)s AND status = 'processing' AND attempts = %(attempt)s;
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, {"id": run_id, "attempt": attempt})
+            renewed = cur.rowcount > 0
+        conn.commit()
+    return renewed
+
+def requeue_stale_ingestion_runs(lease_seconds: float, max_attempts: int) -> int:
+    """
+    Return runs whose worker disappeared (lease not renewed for ``lease_seconds``
+    and still processing) to the queue, or fail them after ``max_attempts``.
 
-def update_ingestion_status(run_id: str, status: str, error_message: str | None = None) -> None:
+    Returns the number of runs touched.
+    """
+    sql = """
+    UPDATE rag_ingestion_run
+    SET status = CASE WHEN attempts < %(max_attempts)s THEN 'queued' ELSE 'failed' END,
+        error_message = CASE
+            WHEN attempts < %(max_attempts)s THEN error_message
+            ELSE 'Ingestion worker stopped before the run finished.'
+        END,
+        finished_at = CASE WHEN attempts < %(max_attempts)s THEN NULL ELSE now() END
+    WHERE status = 'processing'
+      AND claimed_at < now() - make_interval(secs => %(lease_seconds)s);
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, {"lease_seconds": lease_seconds, "max_attempts": max_attempts})
+            touched = cur.rowcount
+        conn.commit()
+    return max(touched, 0)
+
+def update_ingestion_status(
+    run_id: str,
+    status: str,
+    error_message: str | None = None,
+    attempt: int | None = None,
+) -> bool:
     """
     Update the status of an ingestion run.
+
+    With ``attempt``, only a run still ``processing`` under that claim is
+    updated, so a worker that lost its lease cannot overwrite the outcome of
+    the claim that replaced it. Returns whether a row was updated.
     """
     sql = """
     UPDATE rag_ingestion_run
     SET status = %(status)s,
         error_message = %(error_message)s,
         finished_at = (CASE WHEN %(status)s IN ('completed', 'failed') THEN now() ELSE finished_at END)
-    WHERE id = %(id)s;
+    WHERE id = %(id)s
     """
+    if attempt is not None:
+        sql += " AND status = 'processing' AND attempts = %(attempt)s"
+    params = {"id": run_id, "status": status, "error_message": error_message, "attempt": attempt}
     with get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, {"id": run_id, "status": status, "error_message": error_message})
+            cur.execute(sql, params)    # type: ignore
+            updated = cur.rowcount > 0
         conn.commit()
+    return updated
+
+_INGESTION_RUN_SQL = """
+SELECT id, document_id, status, error_message, started_at, finished_at
+FROM rag_ingestion_run
+WHERE id = %(id)s;
+"""
+
 
 def get_ingestion_run(run_id: str) -> dict[str, Any] | None:
     """
     Fetch the status of an ingestion run.
     """
-    sql = """
-    SELECT id, document_id, status, error_message, started_at, finished_at
-    FROM rag_ingestion_run
-    WHERE id = %(id)s;
-    """
     with get_connection() as conn, conn.cursor() as cur:
-            cur.execute(sql, {"id": run_id})
+            cur.execute(_INGESTION_RUN_SQL, {"id": run_id})
             row = cur.fetchone()
+    return _ingestion_run_from_row(row)
+
+
+async def fetch_ingestion_run(conn: psycopg.AsyncConnection, run_id: str) -> dict[str, Any] | None:
+    """
+    Fetch the status of an ingestion run on a pooled async connection.
+    """
+    async with conn.cursor() as cur:
+        await cur.execute(_INGESTION_RUN_SQL, {"id": run_id})
+        row = await cur.fetchone()
+    return _ingestion_run_from_row(row)
+
+
+def _ingestion_run_from_row(row: Sequence[Any] | None) -> dict[str, Any] | None:
     if row:
         return {
             "id": row[0],
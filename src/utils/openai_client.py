@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from functools import cache
+
+import httpx
+
+from src import config
+
+try:  # pragma: no cover - optional dependency for runtime environments without OpenAI
+    from openai import DefaultHttpxClient, OpenAI
+except Exception:  # pragma: no cover - allows offline execution without the SDK
+    DefaultHttpxClient = None  # type: ignore
+    OpenAI = None  # type: ignore
+
+logger = config.LOGGER
+
+
+@cache
+def get_openai_client() -> OpenAI | None:
+    """
+    Return the process-wide OpenAI client, or None without the SDK or an API key.
+
+    Embedding, reranking, and answer generation share one client, so every
+    query reuses the same keep-alive HTTP/2 connection pool instead of building
+    new clients that each pay a TCP/TLS handshake. httpx clients are
+    thread-safe, so the query and ingest worker threads can all use it.
+    """
+    if OpenAI is None or DefaultHttpxClient is None or not config.OPENAI_API_KEY:
+        return None
+    max_connections = max(1, config.OPENAI_MAX_CONNECTIONS)
+    http_client = DefaultHttpxClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+    logger.info("Created shared OpenAI client (HTTP/2, %d connections)", max_connections)
+    return OpenAI(api_key=config.OPENAI_API_KEY, http_client=http_client)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import re
+import threading
 import uuid
 
 from google.cloud import storage
@@ -8,16 +9,34 @@ from google.cloud import storage
 from src import config
 
 DEFAULT_BUCKET_NAME = config.DEFAULT_BUCKET_NAME
+UNSAFE_NAME_RE = re.compile(r"[^a-z0-9._-]+")
+UNSAFE_FOLDER_RE = re.compile(r"[^a-z0-9/_-]+")
 
 _storage_client: storage.Client | None = None
+_bucket: storage.Bucket | None = None
+_storage_lock = threading.Lock()
 logger = config.LOGGER
 
 def _get_storage_client() -> storage.Client:
     global _storage_client
-    if _storage_client is None:
-        # Relies on GOOGLE_APPLICATION_CREDENTIALS or ADC
-        _storage_client = storage.Client()
-    return _storage_client
+    # Uploads run on several threads; the lock keeps them from each building
+    # a client (and its credentials and HTTP session) on first use.
+    with _storage_lock:
+        if _storage_client is None:
+            # Relies on GOOGLE_APPLICATION_CREDENTIALS or ADC
+            _storage_client = storage.Client()
+        return _storage_client
+
+
+def _get_bucket() -> storage.Bucket:
+    """Return the upload bucket handle, built once and shared across uploads."""
+    global _bucket
+    if _bucket is None:
+        client = _get_storage_client()
+        with _storage_lock:
+            if _bucket is None:
+                _bucket = client.bucket(DEFAULT_BUCKET_NAME)
+    return _bucket
 
 
 def _sanitize_name(name: str) -> str:
@@ -30,7 +49,7 @@ def _sanitize_name(name: str) -> str:
     base = name.strip().lower()
     # Replace path separators just in case
     base = base.replace("\\", "/").split("/")[-1]
-    base = re.sub(r"[^a-z0-9._-]+", "-", base)
+    base = UNSAFE_NAME_RE.sub("-", base)
     base = base.strip("-")
     return base or "asset"
 
@@ -39,7 +58,7 @@ def _sanitize_folder(folder: str | None) -> str:
     """Restrict folder names to safe characters and fall back to 'figures'."""
     if not folder:
         return "figures"
-    cleaned = re.sub(r"[^a-z0-9/_-]+", "-", folder.strip().lower())
+    cleaned = UNSAFE_FOLDER_RE.sub("-", folder.strip().lower())
     cleaned = cleaned.strip("/-")
     if not cleaned:
         return "figures"
@@ -67,9 +86,8 @@ def upload_image_fn(image_bytes: bytes, suggested_name: str, folder: str = "figu
         raise TypeError("image_bytes must be bytes or bytearray")
 
     bucket_name = DEFAULT_BUCKET_NAME
-    client = _get_storage_client()
-    logger.info("Uploading image to GCS bucket: %s", bucket_name)
-    bucket = client.bucket(bucket_name)
+    logger.debug("Uploading image to GCS bucket: %s", bucket_name)
+    bucket = _get_bucket()
 
     safe_name = _sanitize_name(suggested_name)
     safe_folder = _sanitize_folder(folder)
@@ -83,3 +101,61 @@ def upload_image_fn(image_bytes: bytes, suggested_name: str, folder: str = "figu
         raise
 
     return f"gs://{bucket_name}/{object_name}"
+
+
+def upload_file_fn(path: str, suggested_name: str, folder: str = "uploads", content_type: str = "application/pdf") -> str:
+    """
+    Upload a local file to Firebase (GCS) and return a gs:// URI.
+
+    Used to stage uploaded PDFs where any API instance can read them, since the
+    local copy lives on one instance's ephemeral disk.
+
+    Args:
+        path: Local file to upload.
+        suggested_name: Human-friendly identifier (used in the object name).
+        folder: Storage folder prefix.
+        content_type: MIME type recorded on the object.
+
+    Returns:
+      e.g. 'gs://chat-ieee.firebasestorage.app/uploads/<uuid>_name.pdf'
+    """
+    bucket_name = DEFAULT_BUCKET_NAME
+    logger.debug("Uploading %s to GCS bucket: %s", path, bucket_name)
+    bucket = _get_bucket()
+
+    object_name = f"{_sanitize_folder(folder)}/{uuid.uuid4().hex}_{_sanitize_name(suggested_name)}"
+
+    blob = bucket.blob(object_name)
+    try:
+        blob.upload_from_filename(path, content_type=content_type)
+    except Exception as e:
+        logger.error("Failed to upload file to GCS: %s", e)
+        raise
+
+    return f"gs://{bucket_name}/{object_name}"
+
+
+def _blob_for_uri(uri: str) -> storage.Blob:
+    if not uri.startswith("gs://") or "/" not in uri[5:]:
+        raise ValueError(f"Not a gs:// object URI: {uri}")
+    bucket_name, object_name = uri[5:].split("/", 1)
+    bucket = _get_bucket() if bucket_name == DEFAULT_BUCKET_NAME else _get_storage_client().bucket(bucket_name)
+    return bucket.blob(object_name)
+
+
+def download_file_fn(uri: str, path: str) -> None:
+    """Download the object at a gs:// URI (as returned by `upload_file_fn`) to ``path``."""
+    blob = _blob_for_uri(uri)
+    try:
+        blob.download_to_filename(path)
+    except Exception as e:
+        logger.error("Failed to download %s from GCS: %s", uri, e)
+        raise
+
+
+def delete_file_fn(uri: str) -> None:
+    """Best-effort delete of the object at a gs:// URI; failures are logged, not raised."""
+    try:
+        _blob_for_uri(uri).delete()
+    except Exception as e:
+        logger.warning("Failed to delete %s from GCS: %s", uri, e)
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from typing import TYPE_CHECKING, BinaryIO
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from src import config
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable
+    from pathlib import Path
+
+logger = config.LOGGER
+
+
+class UploadError(ValueError):
+    """Raised when a request body cannot be parsed into a PDF upload."""
+
+
+class StreamingPdfUpload:
+    """
+    Incrementally parse a multipart/form-data body, writing the file part to disk.
+
+    Bytes for the part named ``file_field`` are written to the destination as they
+    arrive from ``request.stream()``, so the upload never passes through Starlette's
+    SpooledTemporaryFile. Every other part is collected as a text field; since
+    Starlette's multipart limits no longer apply, text fields are capped at
+    ``max_field_bytes`` each and ``max_fields`` in total, and a file part under any
+    other name is rejected. The SHA-256 of the file is computed from the same bytes on the way through, so the
+    stored PDF does not have to be re-read to checksum it.
+
+    Args:
+        content_type: Raw ``Content-Type`` header of the request.
+        destination_factory: Called with ``(filename, content_type)`` once the file
+            part headers are parsed; returns the destination path and a binary file
+            object already opened on it. May raise ``UploadError`` to reject the file.
+        file_field: Name of the form field carrying the PDF.
+        max_field_bytes: Largest accepted text field (and part header value).
+        max_fields: Most text fields accepted in one body.
+    """
+
+    def __init__(
+        self,
+        content_type: str,
+        destination_factory: Callable[[str, str | None], tuple[Path, BinaryIO]],
+        file_field: str = "pdf",
+        max_field_bytes: int = config.UPLOAD_MAX_FIELD_BYTES,
+        max_fields: int = config.UPLOAD_MAX_FIELDS,
+    ) -> None:
+        mime_type, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if mime_type != b"multipart/form-data" or not boundary:
+            raise UploadError("Request body must be multipart/form-data.")
+
+        self.fields: dict[str, str] = {}
+        self.filename: str | None = None
+        self.file_content_type: str | None = None
+        self.destination: Path | None = None
+        self.size = 0
+
+        self._destination_factory = destination_factory
+        self._file_field = file_field
+        self._max_field_bytes = max_field_bytes
+        self._max_fields = max_fields
+        self._field_count = 0
+        self._file: BinaryIO | None = None
+        self._file_started = False
+        self._pending: list[bytes] = []
+        self._digest = hashlib.sha256()
+
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._part_headers: dict[bytes, bytes] = {}
+        self._part_name = ""
+        self._part_is_file = False
+        self._field_data = bytearray()
+
+        self._parser = MultipartParser(
+            boundary,
+            callbacks={
+                "on_part_begin": self._on_part_begin,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+            },
+        )
+
+    async def consume(self, stream: AsyncIterator[bytes]) -> None:
+        """Feed the request stream through the parser until the body is exhausted.
+
+        Parsing runs on the event loop; all file-system calls (path probing, open,
+        write, close) are pushed to the default thread pool so large uploads do not
+        stall concurrent requests.
+        """
+        try:
+            async for chunk in stream:
+                self._parser.write(chunk)
+                await self._drain()
+            self._parser.finalize()
+            await self._drain()
+        except MultipartParseError as exc:
+            raise UploadError(f"Malformed multipart body: {exc}") from exc
+        finally:
+            if self._file is not None:
+                await asyncio.to_thread(self._file.close)
+                self._file = None
+
+    @property
+    def checksum(self) -> str:
+        """Hex SHA-256 of the file bytes received so far."""
+        return self._digest.hexdigest()
+
+    async def discard(self) -> None:
+        """Remove a partially written destination file."""
+        if self.destination is not None:
+            await asyncio.to_thread(self.destination.unlink, missing_ok=True)
+
+    async def _drain(self) -> None:
+        """Open the destination on first file bytes and flush pending data to it."""
+        if self._file_started and self._file is None and self.destination is None:
+            self.destination, self._file = await asyncio.to_thread(
+                self._destination_factory, self.filename or "", self.file_content_type
+            )
+        if not self._pending:
+            return
+        if self._file is None:
+            self._pending.clear()
+            return
+        data = b"".join(self._pending) if len(self._pending) > 1 else self._pending[0]
+        self._pending.clear()
+        self._digest.update(data)
+        await asyncio.to_thread(self._file.write, data)
+        self.size += len(data)
+
+    def _on_part_begin(self) -> None:
+        self._part_headers = {}
+        self._part_name = ""
+        self._part_is_file = False
+        self._field_data = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        if len(self._header_field) + end - start > self._max_field_bytes:
+            raise UploadError("Multipart part header is too large.")
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        if len(self._header_value) + end - start > self._max_field_bytes:
+            raise UploadError("Multipart part header is too large.")
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._part_headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._part_headers.get(b"content-disposition", b""))
+        self._part_name = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename")
+        if filename is not None and self._part_name != self._file_field:
+            raise UploadError(f"Unexpected file part '{self._part_name}'; upload the PDF as '{self._file_field}'.")
+        if filename is None:
+            self._field_count += 1
+            if self._field_count > self._max_fields:
+                raise UploadError(f"Too many form fields (limit {self._max_fields}).")
+            return
+        if self._file_started:
+            raise UploadError(f"Only one '{self._file_field}' file may be uploaded.")
+        self._part_is_file = True
+        self._file_started = True
+        self.filename = filename.decode("utf-8", "replace").strip()
+        content_type = self._part_headers.get(b"content-type")
+        self.file_content_type = content_type.decode("latin-1") if content_type else None
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._part_is_file:
+            self._pending.append(data[start:end])
+        else:
+            if len(self._field_data) + end - start > self._max_field_bytes:
+                raise UploadError(f"Form field '{self._part_name}' exceeds {self._max_field_bytes} bytes.")
+            self._field_data += data[start:end]
+
+    def _on_part_end(self) -> None:
+        if self._part_is_file:
+            return
+        if self._part_name:
+            self.fields[self._part_name] = self._field_data.decode("utf-8", "replace")
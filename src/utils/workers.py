@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from src import config
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = config.LOGGER
+
+T = TypeVar("T")
+
+
+class ChannelFullError(RuntimeError):
+    """Raised when a work channel already holds its maximum number of jobs."""
+
+
+class WorkChannel:
+    """
+    A named, bounded thread pool for one class of blocking work.
+
+    Each workload (queries, PDF ingestion, maintenance backfills) gets its own
+    channel so a burst in one cannot exhaust the threads another depends on, as
+    happens when everything shares the default ``asyncio.to_thread`` pool.
+    ``max_pending`` caps running plus queued jobs; further submissions raise
+    ``ChannelFullError`` instead of queueing without bound.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int) -> None:
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(self.max_workers, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"chatieee-{name}")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def submit(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> Future[T]:
+        """Schedule ``fn`` on the channel without waiting for it (fire-and-forget)."""
+        self._reserve()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    async def run(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """
+        Run ``fn`` on the channel and await its result.
+
+        The slot is released by the job's own completion, not by the awaiting
+        coroutine: cancelling the await cannot stop a job that already started,
+        so it stays counted until it finishes.
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _reserve(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                logger.error("Work channel '%s' is full (%d pending)", self.name, self._pending)
+                raise ChannelFullError(f"Work channel '{self.name}' is at capacity.")
+            self._pending += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+
+QUERY_CHANNEL = WorkChannel("query", config.QUERY_WORKERS, config.QUERY_MAX_PENDING)
+INGEST_CHANNEL = WorkChannel("ingest", config.INGEST_WORKERS, config.INGEST_MAX_PENDING)
+MAINTENANCE_CHANNEL = WorkChannel("maintenance", config.MAINTENANCE_WORKERS, config.MAINTENANCE_MAX_PENDING)
+
+
+def shutdown_channels(wait: bool = False) -> None:
+    """Stop all work channels; called from the API lifespan on shutdown."""
+    for channel in (QUERY_CHANNEL, INGEST_CHANNEL, MAINTENANCE_CHANNEL):
+        channel.shutdown(wait=wait)
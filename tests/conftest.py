@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import random
+from typing import TYPE_CHECKING
+
+import pytest
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text(x: float, y: float, text: str, size: float = 11) -> str:
+    return f"BT /F1 {size} Tf {x:.2f} {y:.2f} Td ({_escape(text)}) Tj ET\n"
+
+
+def _page_content(rng: random.Random, page_number: int) -> str:
+    """Body lines, a caption, a small-font label and words nudged off their baseline."""
+    content = ""
+    y = 740.0
+    for line in range(12):
+        size = rng.choice((9, 10, 11, 12))
+        x = 72.0
+        for word in range(rng.randint(3, 9)):
+            # Superscript-like offsets land inside and just outside the line tolerances.
+            offset = rng.choice((0.0, 0.0, 0.0, 0.8, -1.2, 2.4, 3.1))
+            text = rng.choice(("Figure", "Table", "page", "the", "frame", "MAC", "802.11", "Section"))
+            content += _text(x, y + offset, f"{text}{page_number}{line}{word}", size)
+            # Gaps straddle the x tolerance, so some words merge and some split.
+            x += size * 0.5 * (len(text) + 3) + rng.choice((0.5, 1.5, 2.5, 6.0))
+        y -= rng.choice((11.0, 12.5, 14.0, 18.0))
+    content += "100 230 300 120 re S\n"
+    content += _text(100, 215, f"Figure {page_number}-1\x97 Caption text for page {page_number}")
+    content += _text(100, 203, "continues on a second line", 9)
+    content += _text(100, 120, f"Table {page_number}-2\x97 Parameters", 8)
+    return content
+
+
+def _build_pdf(pages: list[bytes]) -> bytes:
+    objects: list[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pages_id = len(objects) + 1 + 2 * len(pages)
+    kids = []
+    for content in pages:
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(content) + content + b"endstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 %d 0 R >> >> "
+            b"/Contents %d 0 R >>" % (pages_id, font, content_id)
+        ))
+    add(b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % kid for kid in kids) + b"] /Count %d >>" % len(kids))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+@pytest.fixture(scope="session")
+def sample_pdf(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """A small generated PDF whose text sits on uneven baselines and spacings."""
+    rng = random.Random(802)
+    pages = [_page_content(rng, number).encode("latin-1") for number in range(1, 5)]
+    path = tmp_path_factory.mktemp("pdf") / "sample.pdf"
+    path.write_bytes(_build_pdf(pages))
+    return path
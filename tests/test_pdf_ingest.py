@@ -0,0 +1,108 @@
+"""Parity tests: the optimised text helpers must match the pdfplumber/pure-Python code they replaced."""
+from __future__ import annotations
+
+import random
+from typing import TYPE_CHECKING, Any
+
+import pdfplumber
+import pytest
+
+from src.ingest.pdf_ingest import PageText, _group_words_into_lines
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+def _reference_group_words_into_lines(words: list[dict[str, Any]], line_tol: float = 2.5) -> list[dict[str, Any]]:
+    """The loop-based grouping `_group_words_into_lines` replaced."""
+    lines: list[dict[str, Any]] = []
+    for word in sorted(words, key=lambda w: (round(w["top"], 1), w["x0"])):
+        if not (word.get("text") or "").strip():
+            continue
+        if not lines or abs(float(word["top"]) - lines[-1]["top"]) > line_tol:
+            lines.append({
+                "words": [word],
+                "top": float(word["top"]),
+                "bottom": float(word["bottom"]),
+                "x0": float(word["x0"]),
+                "x1": float(word["x1"]),
+            })
+            continue
+        line = lines[-1]
+        line["words"].append(word)
+        line["top"] = min(line["top"], float(word["top"]))
+        line["bottom"] = max(line["bottom"], float(word["bottom"]))
+        line["x0"] = min(line["x0"], float(word["x0"]))
+        line["x1"] = max(line["x1"], float(word["x1"]))
+    for line in lines:
+        line["text"] = " ".join(w["text"] for w in sorted(line["words"], key=lambda w: w["x0"])).strip()
+    return [line for line in lines if line["text"]]
+
+
+@pytest.fixture(scope="module")
+def pdf(sample_pdf: Path) -> Iterator[pdfplumber.PDF]:
+    with pdfplumber.open(sample_pdf) as document:
+        yield document
+
+
+def _probe_boxes(page: Any, rng: random.Random) -> list[tuple[float, float, float, float]]:
+    """Caption-like strips around each word line, a coarse grid, and random boxes."""
+    x0, top, x1, bottom = page.bbox
+    boxes = []
+    for line in _group_words_into_lines(page.extract_words()):
+        boxes.append((max(x0, line["x0"] - 2), max(top, line["top"] - 2), min(x1, line["x1"] + 2), min(bottom, line["bottom"] + 2)))
+        boxes.append((x0, max(top, line["top"] - 30), x1, min(bottom, line["bottom"])))
+    step_x, step_y = (x1 - x0) / 4, (bottom - top) / 6
+    boxes.extend(
+        (x0 + i * step_x, top + j * step_y, x0 + (i + 1) * step_x, top + (j + 1) * step_y)
+        for i in range(4)
+        for j in range(6)
+    )
+    for _ in range(40):
+        left, right = sorted(rng.uniform(x0, x1) for _ in range(2))
+        upper, lower = sorted(rng.uniform(top, bottom) for _ in range(2))
+        boxes.append((left, upper, right, lower))
+    return boxes
+
+
+def test_page_text_matches_within_bbox_extract_text(pdf: pdfplumber.PDF) -> None:
+    rng = random.Random(11)
+    checked = 0
+    for page in pdf.pages:
+        page_text = PageText(page)
+        for bbox in _probe_boxes(page, rng):
+            expected = page.within_bbox(bbox).extract_text(x_tolerance=2, y_tolerance=2)
+            assert page_text.extract_within(bbox) == expected, bbox
+            checked += bool(expected)
+    assert checked > 100
+
+
+def test_page_text_rejects_box_outside_page(pdf: pdfplumber.PDF) -> None:
+    page = pdf.pages[0]
+    with pytest.raises(ValueError, match="outside parent page"):
+        PageText(page).extract_within((-10.0, -10.0, -1.0, -1.0))
+
+
+def test_group_words_into_lines_matches_reference_on_pdf(pdf: pdfplumber.PDF) -> None:
+    for page in pdf.pages:
+        words = page.extract_words()
+        assert _group_words_into_lines(words) == _reference_group_words_into_lines(words)
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_group_words_into_lines_matches_reference_on_random_words(seed: int) -> None:
+    rng = random.Random(seed)
+    words = []
+    for _ in range(rng.randint(0, 60)):
+        top = rng.choice((100.0, 112.0, 124.0)) + rng.choice((0.0, 0.04, 0.06, 1.3, -2.4, 2.5, 2.6, 3.0))
+        x0 = rng.uniform(50, 500)
+        words.append({
+            "text": rng.choice(("Figure", "1-2", "", "  ", "caption", "—")),
+            "x0": x0,
+            "x1": x0 + rng.uniform(1, 40),
+            "top": top,
+            "bottom": top + rng.uniform(6, 12),
+        })
+    line_tol = rng.choice((1.0, 2.5, 4.0))
+    assert _group_words_into_lines(words, line_tol) == _reference_group_words_into_lines(words, line_tol)
@@ -0,0 +1,119 @@
+"""Parity tests: `StructureTracker` must track the same structure as the per-pattern scan it replaced."""
+from __future__ import annotations
+
+import random
+import re
+from typing import Any
+
+import pytest
+
+from src.ingest.embed_and_update_chunks import StructureTracker
+
+
+class ReferenceTracker(StructureTracker):
+    """`consume` as it was before the single-pass rewrite; `_update_hierarchy` is shared."""
+    PAGE_PATTERNS = (
+        re.compile(r"(?i)\bpage\s+(?P<page>\d{1,4})\b"),
+        re.compile(r"(?i)\bpg\.\s*(?P<page>\d{1,4})\b"),
+        re.compile(r"(?i)\bp\.\s*(?P<page>\d{1,4})\b"),
+        re.compile(r"^\s*-{0,3}\s*(?P<page>\d{1,4})\s*-{0,3}\s*$"),
+    )
+
+    def consume(self, content: str) -> dict[str, Any]:
+        pages = self.extract_page_numbers(content)
+        if pages:
+            ordered = tuple(sorted(set(pages)))
+            self._state.page_span = ordered
+            self._state.page_number = ordered[0]
+        for line in content.splitlines():
+            stripped = line.strip()
+            if not stripped:
+                continue
+            matched_page = self.match_page_number(stripped)
+            if matched_page is not None:
+                self._state.page_number = matched_page
+                self._state.page_span = tuple(sorted({matched_page, *self._state.page_span}))
+                continue
+            match = self.STRUCTURE_RE.match(stripped)
+            if match:
+                numbering = match.group("num")
+                title = match.group("title").strip().rstrip(". ")
+                self._update_hierarchy(numbering, f"{numbering} {title}".strip())
+                continue
+            if self.ALT_HEADING_RE.match(stripped):
+                self._state.heading = stripped.title()
+                self._state.section = None
+                self._state.subsection = None
+        return self._state.to_metadata()
+
+    def match_page_number(self, line: str) -> int | None:
+        for pattern in self.PAGE_PATTERNS:
+            match = pattern.search(line)
+            if match:
+                return int(match.group("page"))
+        return None
+
+    def extract_page_numbers(self, content: str) -> list[int]:
+        return [int(match.group("page")) for pattern in self.PAGE_PATTERNS for match in pattern.finditer(content)]
+
+
+LINES = (
+    "",
+    "   ",
+    "12",
+    " - 34 - ",
+    "--7--",
+    "12345",
+    "see page 12 and pg. 14",
+    "Page 3 of 40",
+    "p. 7, p.8 and P. 9",
+    "as in pg.5 (page 6)",
+    "p. 3 then pg. 4",
+    "pg. 20 or p. 21 or page 2",
+    "step. 4 is not a reference",
+    "pages 12 onward",
+    "report p.12345",
+    "1 Overview",
+    "4.2 Frame formats.",
+    "4.2.1 Control frames",
+    "4.2.1.3 Reserved fields",
+    "Section 9.3 Medium access",
+    "10) Annex text",
+    "MEDIUM ACCESS CONTROL",
+    "MAC/PHY & OTHER",
+    "Not A Heading",
+    "ABC",
+    "The frame body is described on page 44.",
+    "Figure 4-2—Frame format (p. 51)",
+)
+
+
+def _random_chunk(rng: random.Random) -> str:
+    if rng.random() < 0.1:
+        return rng.choice(("12", "\n 7 \n", "- 3 -\n\n", "   "))
+    lines = [rng.choice(LINES) for _ in range(rng.randint(1, 6))]
+    return rng.choice(("\n", "\r\n", "\n\n")).join(lines)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_consume_matches_reference(seed: int) -> None:
+    rng = random.Random(seed)
+    tracker, reference = StructureTracker(), ReferenceTracker()
+    for _ in range(30):
+        if rng.random() < 0.1:
+            tracker.reset()
+            reference.reset()
+        content = _random_chunk(rng)
+        assert tracker.consume(content) == reference.consume(content), content
+
+
+@pytest.mark.parametrize("line", [line.strip() for line in LINES if line.strip()])
+def test_scan_line_pages_matches_reference(line: str) -> None:
+    reference = ReferenceTracker()
+    refs: set[int] = set()
+    page, _ = StructureTracker()._scan_line_pages(line, refs)
+    assert page == reference.match_page_number(line)
+    # The bare-number pattern only counts as a reference for a whole chunk, which consume handles.
+    assert refs == {
+        int(match.group("page")) for pattern in reference.PAGE_PATTERNS[:3] for match in pattern.finditer(line)
+    }
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING, BinaryIO
+
+import pytest
+
+from src.utils.uploads import StreamingPdfUpload, UploadError
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from pathlib import Path
+
+BOUNDARY = "chatieee-test-boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def _part(name: str, data: bytes, filename: str | None = None) -> bytes:
+    disposition = f'form-data; name="{name}"'
+    headers = ""
+    if filename is not None:
+        disposition += f'; filename="{filename}"'
+        headers = "Content-Type: application/pdf\r\n"
+    return f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n{headers}\r\n".encode() + data + b"\r\n"
+
+
+def _body(*parts: bytes) -> bytes:
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def _stream(body: bytes, chunk_size: int = 4096) -> AsyncIterator[bytes]:
+    for start in range(0, len(body), chunk_size):
+        yield body[start:start + chunk_size]
+
+
+def _upload(tmp_path: Path, **kwargs: int) -> StreamingPdfUpload:
+    def destination(filename: str, _content_type: str | None) -> tuple[Path, BinaryIO]:
+        path = tmp_path / filename
+        return path, path.open("wb")
+
+    return StreamingPdfUpload(CONTENT_TYPE, destination_factory=destination, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_streams_pdf_and_collects_fields(tmp_path: Path) -> None:
+    pdf = b"%PDF-1.7\n" + bytes(range(256)) * 100
+    upload = _upload(tmp_path)
+    await upload.consume(
+        _stream(_body(_part("title", b"Overview"), _part("pdf", pdf, "doc.pdf"), _part("draft_document", b"true")))
+    )
+
+    assert upload.fields == {"title": "Overview", "draft_document": "true"}
+    assert upload.filename == "doc.pdf"
+    assert upload.destination == tmp_path / "doc.pdf"
+    assert upload.destination.read_bytes() == pdf
+    assert upload.size == len(pdf)
+    assert upload.checksum == hashlib.sha256(pdf).hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_rejects_oversized_field(tmp_path: Path) -> None:
+    upload = _upload(tmp_path, max_field_bytes=1024)
+    with pytest.raises(UploadError, match="exceeds 1024 bytes"):
+        await upload.consume(_stream(_body(_part("title", b"x" * 1025))))
+
+
+@pytest.mark.asyncio
+async def test_accepts_field_at_limit(tmp_path: Path) -> None:
+    upload = _upload(tmp_path, max_field_bytes=1024)
+    await upload.consume(_stream(_body(_part("title", b"x" * 1024))))
+    assert upload.fields == {"title": "x" * 1024}
+
+
+@pytest.mark.asyncio
+async def test_rejects_too_many_fields(tmp_path: Path) -> None:
+    upload = _upload(tmp_path, max_fields=3)
+    parts = [_part(f"field{i}", b"v") for i in range(4)]
+    with pytest.raises(UploadError, match="Too many form fields"):
+        await upload.consume(_stream(_body(*parts)))
+
+
+@pytest.mark.asyncio
+async def test_rejects_file_part_under_other_name(tmp_path: Path) -> None:
+    upload = _upload(tmp_path)
+    with pytest.raises(UploadError, match="Unexpected file part 'junk'"):
+        await upload.consume(_stream(_body(_part("junk", b"\0" * (1 << 20), "a.bin"))))
+    assert upload.fields == {}
+    assert upload.destination is None
+
+
+@pytest.mark.asyncio
+async def test_pdf_part_without_filename_is_capped(tmp_path: Path) -> None:
+    upload = _upload(tmp_path, max_field_bytes=1024)
+    with pytest.raises(UploadError, match="Form field 'pdf'"):
+        await upload.consume(_stream(_body(_part("pdf", b"%PDF" * 1024))))
+    assert upload.destination is None
+
+
+@pytest.mark.asyncio
+async def test_rejects_second_pdf_part(tmp_path: Path) -> None:
+    upload = _upload(tmp_path)
+    with pytest.raises(UploadError, match="Only one 'pdf' file"):
+        await upload.consume(_stream(_body(_part("pdf", b"%PDF-1", "a.pdf"), _part("pdf", b"%PDF-2", "b.pdf"))))
+    await upload.discard()
+    assert not (tmp_path / "a.pdf").exists()
+
+
+def test_rejects_non_multipart_body() -> None:
+    with pytest.raises(UploadError, match="multipart/form-data"):
+        StreamingPdfUpload("application/json", destination_factory=lambda *_: (None, None))  # type: ignore[arg-type,return-value]
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import TYPE_CHECKING
+
+import pytest
+
+from src.utils.workers import ChannelFullError, WorkChannel
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+@pytest.fixture
+def channel() -> Iterator[WorkChannel]:
+    work_channel = WorkChannel("test", max_workers=1, max_pending=2)
+    yield work_channel
+    work_channel.shutdown(wait=True)
+
+
+def _fail() -> None:
+    raise RuntimeError("job failed")
+
+
+def test_submit_raises_when_channel_full(channel: WorkChannel) -> None:
+    gate = threading.Event()
+    first = channel.submit(gate.wait)
+    second = channel.submit(gate.wait)
+    assert channel.pending == 2
+    with pytest.raises(ChannelFullError):
+        channel.submit(gate.wait)
+    assert channel.pending == 2
+
+    gate.set()
+    first.result(timeout=5)
+    second.result(timeout=5)
+    assert channel.pending == 0
+    channel.submit(lambda: None).result(timeout=5)
+
+
+def test_submit_releases_slot_when_job_raises(channel: WorkChannel) -> None:
+    future = channel.submit(_fail)
+    with pytest.raises(RuntimeError, match="job failed"):
+        future.result(timeout=5)
+    assert channel.pending == 0
+
+
+def test_max_pending_is_at_least_max_workers() -> None:
+    work_channel = WorkChannel("test", max_workers=3, max_pending=1)
+    assert work_channel.max_pending == 3
+    work_channel.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result_and_releases_slot(channel: WorkChannel) -> None:
+    assert await channel.run(lambda a, b=0: a + b, 1, b=2) == 3
+    assert channel.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_run_releases_slot_when_job_raises(channel: WorkChannel) -> None:
+    with pytest.raises(RuntimeError, match="job failed"):
+        await channel.run(_fail)
+    assert channel.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_run_raises_when_channel_full(channel: WorkChannel) -> None:
+    gate = threading.Event()
+    running = [channel.submit(gate.wait), channel.submit(gate.wait)]
+    with pytest.raises(ChannelFullError):
+        await channel.run(lambda: None)
+    gate.set()
+    for future in running:
+        await asyncio.wrap_future(future)
+    assert channel.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_run_holds_slot_until_job_finishes(channel: WorkChannel) -> None:
+    started, gate = threading.Event(), threading.Event()
+
+    def job() -> None:
+        started.set()
+        gate.wait(5)
+
+    task = asyncio.create_task(channel.run(job))
+    assert await asyncio.to_thread(started.wait, 5)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    # The job is still running on the pool, so its slot stays taken.
+    assert channel.pending == 1
+
+    gate.set()
+    for _ in range(500):
+        if channel.pending == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert channel.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_run_still_queued_releases_slot(channel: WorkChannel) -> None:
+    gate = threading.Event()
+    blocker = channel.submit(gate.wait)
+    ran = threading.Event()
+    task = asyncio.create_task(channel.run(ran.set))
+    await asyncio.sleep(0)
+    assert channel.pending == 2
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    # Never started, so cancelling the await drops the job and frees its slot.
+    assert channel.pending == 1
+
+    gate.set()
+    await asyncio.wrap_future(blocker)
+    assert channel.pending == 0
+    assert not ran.is_set()